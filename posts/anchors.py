@@ -0,0 +1,128 @@
+"""
+Якорный индекс для лент с номерами страниц.
+
+Для ``?page=N`` обычный Paginator делает COUNT(*) и OFFSET (N - 1) * 10,
+что на глубоких страницах означает проход по всей таблице. Здесь число
+записей ленты хранится в FeedIndex, а каждые POSTS_ANCHOR_EVERY страниц
+в FeedAnchor запоминается граница (pub_date, id). Страница N читается
+поиском от ближайшего якоря, и OFFSET не превышает K страниц.
+"""
+from django.conf import settings
+from django.core.paginator import (EmptyPage, Page, PageNotAnInteger,
+                                   Paginator)
+from django.db.models import F, Q
+
+from .models import FeedAnchor, FeedIndex
+
+GLOBAL_FEED = 'all'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def feed_keys(author_id, group_id):
+    keys = [GLOBAL_FEED, author_feed(author_id)]
+    if group_id is not None:
+        keys.append(group_feed(group_id))
+    return keys
+
+
+def _not_older_than(pub_date, post_id):
+    return Q(pub_date__gt=pub_date) | Q(pub_date=pub_date,
+                                        post_id__gte=post_id)
+
+
+def feed_changed(keys, post, delta):
+    """
+    Учесть добавление (delta=1) или удаление (delta=-1) записи в лентах.
+
+    Ранг записей старше ``post`` не меняется, а якоря на ней и новее неё
+    сдвигаются, поэтому они удаляются и будут достроены при чтении.
+    """
+    FeedIndex.objects.filter(key__in=keys).update(count=F('count') + delta)
+    FeedAnchor.objects.filter(
+        _not_older_than(post.pub_date, post.pk), feed__key__in=keys,
+    ).delete()
+
+
+def _anchor_step(per_page):
+    return settings.POSTS_ANCHOR_EVERY * per_page
+
+
+def _get_anchor(feed, queryset, position, step):
+    """
+    Вернуть (pub_date, id) записи с рангом ``position`` от старейшей.
+
+    Недостающие якоря достраиваются от ближайшего известного, по одному
+    запросу с OFFSET ``step`` на каждый.
+    """
+    known = feed.anchors.filter(position__lte=position).order_by(
+        '-position').values_list('position', 'pub_date', 'post_id').first()
+    if known is None:
+        known = (0, None, None)
+    current, pub_date, post_id = known
+    ascending = queryset.order_by('pub_date', 'id')
+    created = []
+    while current < position:
+        rows = ascending
+        if pub_date is not None:
+            rows = rows.filter(Q(pub_date__gt=pub_date)
+                               | Q(pub_date=pub_date, id__gte=post_id))
+        boundary = list(rows.values_list('pub_date', 'id')[step:step + 1])
+        if not boundary:
+            break
+        current += step
+        pub_date, post_id = boundary[0]
+        created.append(FeedAnchor(feed=feed, position=current,
+                                  pub_date=pub_date, post_id=post_id))
+    if created:
+        FeedAnchor.objects.bulk_create(created, ignore_conflicts=True)
+    if current != position:
+        return None
+    return pub_date, post_id
+
+
+def get_numbered_page(key, queryset, number, per_page):
+    """
+    Вернуть (page, paginator) для ``?page=N`` без COUNT(*) и глубокого OFFSET.
+
+    Первые K страниц читаются обычным OFFSET, он и так ограничен.
+    """
+    feed = FeedIndex.objects.filter(key=key).first()
+    if feed is None:
+        feed, _ = FeedIndex.objects.get_or_create(
+            key=key, defaults={'count': queryset.count()})
+    paginator = Paginator(queryset, per_page)
+    paginator.count = feed.count
+    try:
+        number = paginator.validate_number(number)
+    except PageNotAnInteger:
+        number = 1
+    except EmptyPage:
+        number = paginator.num_pages
+    top = (number - 1) * per_page
+    step = _anchor_step(per_page)
+    if top < step:
+        return paginator.page(number), paginator
+    size = min(per_page, feed.count - top)
+    lowest = feed.count - top - size
+    position = lowest - lowest % step
+    offset = lowest - position
+    rows = queryset.order_by('pub_date', 'id')
+    if position:
+        anchor = _get_anchor(feed, queryset, position, step)
+        if anchor is None:
+            # счётчик разошёлся с таблицей: пересчитаем его с нуля
+            FeedIndex.objects.filter(pk=feed.pk).delete()
+            paginator = Paginator(queryset, per_page)
+            return paginator.get_page(number), paginator
+        pub_date, post_id = anchor
+        rows = rows.filter(Q(pub_date__gt=pub_date)
+                           | Q(pub_date=pub_date, id__gte=post_id))
+    object_list = list(rows[offset:offset + size])[::-1]
+    return Page(object_list, number, paginator), paginator
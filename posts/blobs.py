@@ -0,0 +1,105 @@
+"""
+Счётчики ссылок на картинки в хранилище по содержимому и сборка мусора.
+
+Сигналы записей увеличивают ImageBlob.references при появлении картинки
+у записи и уменьшают при её замене или удалении записи. collect()
+удаляет файлы без ссылок вместе с их вариантами, уменьшенными копиями и
+миниатюрами. Файл, которого касались позже чем grace секунд назад, не
+трогается: его может как раз сохранять новая запись.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db.models import Count, F
+from sorl import thumbnail
+
+from . import resize
+from .models import ImageBlob, Post
+from .storage import BLOB_RE, image_storage
+
+
+def acquire(name):
+    ImageBlob.objects.get_or_create(name=name)
+    ImageBlob.objects.filter(name=name).update(
+        references=F('references') + 1)
+
+
+def release(name):
+    ImageBlob.objects.filter(name=name).update(
+        references=F('references') - 1)
+
+
+def recount():
+    """Пересчитать ссылки по самим записям."""
+    references = dict(Post.objects.exclude(image='').exclude(
+        image=None).values('image').annotate(
+        references=Count('id')).order_by().values_list('image', 'references'))
+    for blob in ImageBlob.objects.all():
+        count = references.pop(blob.name, 0)
+        if blob.references != count:
+            ImageBlob.objects.filter(pk=blob.pk).update(references=count)
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=name, references=count)
+         for name, count in references.items()])
+
+
+def orphans():
+    """Файлы хранилища, о которых нет ImageBlob: незаконченные загрузки."""
+    root = image_storage.path('')
+    known = set(ImageBlob.objects.values_list('name', flat=True))
+    for directory, _, names in os.walk(image_storage.path('posts')):
+        for filename in names:
+            name = os.path.relpath(os.path.join(directory, filename), root)
+            name = name.replace(os.sep, '/')
+            if BLOB_RE.match(filename) and name not in known:
+                yield name
+
+
+def _modified(name):
+    try:
+        return os.path.getmtime(image_storage.path(name))
+    except (FileNotFoundError, SuspiciousFileOperation):
+        return 0
+
+
+def remove(name):
+    """Удалить файл и всё, что из него сделано."""
+    try:
+        thumbnail.delete(name, delete_file=False)
+        image_storage.delete(name)
+    except (FileNotFoundError, SuspiciousFileOperation):
+        return
+    # каталог вариантов, см. images.variant_name
+    variants = 'variants/' + os.path.splitext(name)[0]
+    if default_storage.exists(variants):
+        for filename in default_storage.listdir(variants)[1]:
+            default_storage.delete(f'{variants}/{filename}')
+    for width in settings.POSTS_RESIZE_WIDTHS:
+        try:
+            os.unlink(resize.cached_path(width, name))
+        except FileNotFoundError:
+            pass
+
+
+def collect(grace=None):
+    """Удалить файлы без ссылок и вернуть их имена."""
+    if grace is None:
+        grace = settings.POSTS_BLOB_GC_GRACE
+    deadline = time.time() - grace
+    names = set(ImageBlob.objects.filter(
+        references__lte=0).values_list('name', flat=True))
+    names.update(orphans())
+    collected = []
+    for name in sorted(names):
+        if _modified(name) > deadline:
+            continue
+        if Post.objects.filter(image=name).exists():
+            # счётчик разошёлся с записями — файл нужен
+            continue
+        remove(name)
+        ImageBlob.objects.filter(name=name, references__lte=0).delete()
+        collected.append(name)
+    return collected
@@ -0,0 +1,176 @@
+"""
+Версии лент для кэша фрагментов.
+
+У каждой ленты (общей, группы, автора, подписок пользователя) есть
+счётчик-поколение в кэше. Он входит в ключ фрагмента и увеличивается
+сигналами Post/Comment/Follow, поэтому фрагменты живут часами, но
+устаревают сразу после изменения, а не по таймауту.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .anchors import GLOBAL_FEED, author_feed, group_feed
+from .models import Group, Post, User
+from .timeline import followed_authors
+
+# Поколение названий групп: их подписи есть в карточках любой ленты
+GROUPS = 'groups'
+# Общее поколение: растёт при любом изменении любой ленты
+ANY_FEED = 'any'
+
+
+def follower_feed(user_id):
+    return f'follower:{user_id}'
+
+
+def post_feed(post_id):
+    return f'post:{post_id}'
+
+
+def version_key(feed):
+    return f'feed_version:{feed}'
+
+
+def _fresh_version():
+    # после вытеснения счётчик начинается с большего числа, чем раньше,
+    # и старые фрагменты не оживают
+    return int(time.time() * 1000)
+
+
+def get_versions(feeds):
+    """Текущие поколения лент в порядке ``feeds``."""
+    keys = [version_key(feed) for feed in feeds]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), None)
+            versions[key] = cache.get(key, _fresh_version())
+    return [versions[key] for key in keys]
+
+
+def bump(*feeds):
+    """Сделать устаревшими все фрагменты лент ``feeds``."""
+    # общее поколение растёт первым: кто увидел новое поколение ленты,
+    # увидит и новое общее
+    for feed in (ANY_FEED, *feeds):
+        key = version_key(feed)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _fresh_version(), None)
+
+
+def _fragment_parts(request, feeds, private):
+    parts = [*feeds, request.GET.urlencode()]
+    # кнопка «Редактировать» в карточке зависит от читателя
+    if private or request.user.is_authenticated:
+        parts.append(str(request.user.pk))
+    return '|'.join(parts), '|'.join(map(str, get_versions(feeds)))
+
+
+def _md5(value):
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def fragment_key(request, feeds, private=False):
+    """
+    Ключ состояния страницы ленты.
+
+    Содержит поколения лент, параметры страницы и, для ``private``,
+    id читателя, чтобы личные ленты никогда не попадали к другим.
+    """
+    return _md5('|'.join(_fragment_parts(request, feeds, private)))
+
+
+def follow_feeds(user_id):
+    """Ленты, из которых собрана лента подписок: читателя и его авторов."""
+    return [follower_feed(user_id)] + [
+        author_feed(author_id) for author_id in followed_authors(user_id)]
+
+
+def fragment_context(request, feeds, private=False):
+    """
+    Контекст для ``{% fragment_cache %}`` страницы ленты.
+
+    Ключ фрагмента не зависит от поколений, они передаются отдельно как
+    версия: так после изменения ленты прежний фрагмент ещё можно отдать,
+    пока новый рендерится одним запросом.
+    """
+    # подписи групп есть в карточках любой ленты, как и в _etag
+    key, version = _fragment_parts(request, [GROUPS, *feeds], private)
+    return {'fragment_key': _md5(key),
+            'fragment_version': _md5(version),
+            'fragment_timeout': settings.POSTS_FRAGMENT_TIMEOUT}
+
+
+def mark_stale(request):
+    """
+    Отметить, что в ответ на ``request`` попал устаревший фрагмент.
+
+    Валидаторы ответа уже относятся к новому поколению лент, поэтому
+    такой ответ нельзя ни сохранять в кэше страниц, ни отдавать с ETag.
+    """
+    request.stale_fragments = True
+
+
+def is_stale(request):
+    return getattr(request, 'stale_fragments', False)
+
+
+def surrogate_keys(posts):
+    """Суррогатные ключи карточек: сама запись и её группа."""
+    keys = []
+    for post in posts:
+        keys.append(post_feed(post.pk))
+        if post.group_id is not None:
+            keys.append(group_feed(post.group_id))
+    return keys
+
+
+def tag_response(response, keys):
+    """
+    Пометить ответ суррогатными ключами.
+
+    По ним AnonymousPageCacheMiddleware сбрасывает сохранённую страницу,
+    а обратный прокси может очищать свой кэш по заголовку Surrogate-Key.
+    """
+    response['Surrogate-Key'] = ' '.join(dict.fromkeys(keys))
+    return response
+
+
+# Валидаторы условных GET (ETag) считаются до рендеринга по поколениям
+# лент и, самое большее, одному запросу по индексу, поэтому ответ 304
+# не трогает шаблоны. В них входят параметры страницы и id вошедшего
+# читателя: кнопки в карточках зависят от него.
+
+def _etag(request, feeds):
+    return fragment_key(request, [GROUPS, *feeds])
+
+
+def index_etag(request):
+    return _etag(request, [GLOBAL_FEED])
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True).first()
+    if group_id is not None:
+        return _etag(request, [group_feed(group_id)])
+
+
+def profile_etag(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True).first()
+    if author_id is not None:
+        return _etag(request, [author_feed(author_id)])
+
+
+def post_etag(request, username, post_id):
+    author_id = Post.objects.filter(
+        id=post_id, author__username=username).values_list(
+        'author_id', flat=True).first()
+    if author_id is not None:
+        return _etag(request, [post_feed(post_id), author_feed(author_id)])
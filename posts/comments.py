@@ -0,0 +1,63 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
+
+from .models import Comment
+from .paginator import CursorPaginator
+from .thumbnails import attach_thumbnails
+
+
+def attach_latest_comments(posts, limit=None):
+    """
+    Положить в ``post.latest_comments`` последние комментарии каждой записи.
+
+    Комментарии всех записей страницы выбираются одним запросом с
+    ROW_NUMBER() по записи, их авторы — ещё одним, сколько бы записей
+    и комментариев ни было.
+    """
+    limit = limit or settings.POSTS_COMMENTS_PREVIEW
+    latest = defaultdict(list)
+    ids = [post.pk for post in posts if post.comment_count]
+    if ids:
+        ranked = Comment.objects.filter(post_id__in=ids).annotate(
+            position=Window(
+                expression=RowNumber(),
+                partition_by=[F('post_id')],
+                order_by=[F('created').desc(), F('id').desc()],
+            ),
+        ).order_by()
+        sql, params = ranked.query.sql_with_params()
+        comments = list(Comment.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE position <= %s '
+            f'ORDER BY post_id, position',
+            (*params, limit),
+        ))
+        prefetch_related_objects(comments, 'author')
+        for comment in comments:
+            latest[comment.post_id].append(comment)
+    for post in posts:
+        post.latest_comments = latest[post.pk]
+    return posts
+
+
+def attach_to_page(page):
+    """
+    Выбрать записи страницы и приложить к ним последние комментарии
+    и миниатюры картинок.
+    """
+    page.object_list = attach_thumbnails(
+        attach_latest_comments(list(page.object_list)))
+    return page
+
+
+def comment_queryset(post):
+    return post.comments.select_related('author')
+
+
+def get_comment_page(request, comments):
+    """Страница комментариев (queryset записи) после курсора ``?after=``."""
+    paginator = CursorPaginator(comments, settings.POSTS_COMMENTS_PER_PAGE,
+                                field='created')
+    return paginator.get_page(after=request.GET.get('after'))
@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
 from .models import Post, Comment
+from .uploads import process_image
 
 
 class PostForm(forms.ModelForm):
@@ -22,6 +24,13 @@ class PostForm(forms.ModelForm):
             raise forms.ValidationError("Это поле обязательно для заполнения")
         return data
 
+    def clean_image(self):
+        """Новую картинку проверить и пересохранить (posts.uploads)."""
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return process_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
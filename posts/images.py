@@ -0,0 +1,219 @@
+"""
+Варианты картинок записей, готовые до первого просмотра.
+
+Сразу после сохранения записи с новой картинкой (transaction.on_commit)
+картинка уменьшается до каждой ширины из POSTS_IMAGE_WIDTHS в каждом
+формате из POSTS_IMAGE_FORMATS. Pillow работает в пуле процессов вне
+запроса; когда варианты готовы, их ширины записываются в
+Post.image_variants, и карточка выводит <picture> со srcset вместо
+ленивого {% thumbnail %}.
+"""
+import logging
+import os
+from base64 import b64encode
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import cache
+from .anchors import feed_keys
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+# EXIF-ориентации, при которых картинка поворачивается на 90°
+ROTATED = {5, 6, 7, 8}
+
+_executor = None
+
+
+def variant_name(name, width, image_format):
+    """posts/cat.png -> variants/posts/cat/640.webp"""
+    stem = os.path.splitext(name)[0]
+    return f'variants/{stem}/{width}.{EXTENSIONS[image_format]}'
+
+
+def variant_widths(original_width):
+    """Ширины не больше исходной; узкая картинка остаётся своей ширины."""
+    widths = [width for width in settings.POSTS_IMAGE_WIDTHS
+              if width <= original_width]
+    return widths or [original_width]
+
+
+def generate_variants(name):
+    """
+    Записать все варианты картинки ``name`` в хранилище и вернуть
+    их ширины. Выполняется в процессе пула, поэтому обращается только
+    к хранилищу, но не к базе и кэшу.
+    """
+    try:
+        with default_storage.open(name) as file, Image.open(file) as image:
+            image.load()
+            widths = variant_widths(image.width)
+            for width in widths:
+                height = max(round(image.height * width / image.width), 1)
+                resized = image.resize((width, height), Image.LANCZOS)
+                if resized.mode not in ('RGB', 'RGBA'):
+                    resized = resized.convert('RGBA')
+                for image_format in settings.POSTS_IMAGE_FORMATS:
+                    _save(resized, variant_name(name, width, image_format),
+                          image_format)
+    except (FileNotFoundError, SuspiciousFileOperation):
+        return []
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning('Не удалось подготовить варианты %s', name,
+                       exc_info=True)
+        return []
+    return widths
+
+
+def describe(image_file):
+    """
+    Ширина, высота и заглушка картинки записи — data: URI размером в
+    POSTS_PLACEHOLDER_SIZE точек, — или (None, None, ''), если файла нет.
+    Новая загрузка читается до того, как попадёт в хранилище.
+    """
+    try:
+        if not image_file:
+            return None, None, ''
+        if image_file._committed:
+            with image_file.storage.open(image_file.name) as file:
+                return _describe(file)
+        return _describe(image_file.file)
+    except (FileNotFoundError, SuspiciousFileOperation):
+        return None, None, ''
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning('Не удалось прочитать картинку %s', image_file.name,
+                       exc_info=True)
+        return None, None, ''
+
+
+def _describe(file):
+    size = settings.POSTS_PLACEHOLDER_SIZE
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+            if image.getexif().get(0x0112) in ROTATED:
+                width, height = height, width
+            image.draft('RGB', (size, size))
+            small = ImageOps.exif_transpose(image)
+            small.thumbnail((size, size))
+            small = small.convert('RGBA' if 'A' in small.getbands()
+                                  else 'RGB')
+            buffer = BytesIO()
+            small.save(buffer, 'webp', quality=30)
+    finally:
+        file.seek(0)
+    data = b64encode(buffer.getvalue()).decode()
+    return width, height, f'data:image/webp;base64,{data}'
+
+
+def _save(image, name, image_format):
+    if image_format == 'jpeg' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=settings.POSTS_IMAGE_QUALITY,
+               optimize=image_format == 'jpeg')
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def mark_ready(post_id, name, widths):
+    """Записать ширины готовых вариантов и сбросить кэш карточки."""
+    if not widths:
+        return
+    _update(post_id, name, image_variants=','.join(map(str, widths)))
+
+
+def mark_described(post_id, image_file):
+    """Записать размеры и заглушку картинки записи (для старых записей)."""
+    width, height, placeholder = describe(image_file)
+    if width:
+        _update(post_id, image_file.name, image_width=width,
+                image_height=height, image_placeholder=placeholder)
+    return bool(width)
+
+
+def _update(post_id, name, **fields):
+    updated = Post.objects.filter(pk=post_id, image=name).update(
+        updated=timezone.now(), **fields)
+    if updated:
+        post = Post.objects.filter(pk=post_id).values_list(
+            'author_id', 'group_id').first()
+        cache.bump(cache.post_feed(post_id), *feed_keys(*post))
+
+
+def _finished(post_id, name, future):
+    # колбэк выполняется в служебном потоке пула со своим соединением
+    close_old_connections()
+    try:
+        mark_ready(post_id, name, future.result())
+    except Exception:
+        logger.exception('Не удалось сохранить варианты %s', name)
+    finally:
+        close_old_connections()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(settings.POSTS_IMAGE_WORKERS)
+    return _executor
+
+
+def _stored(name, widths):
+    return all(
+        default_storage.exists(variant_name(name, width, image_format))
+        for width in widths
+        for image_format in settings.POSTS_IMAGE_FORMATS)
+
+
+def schedule(post_id, name):
+    """
+    Подготовить варианты картинки записи в пуле процессов и вернуть
+    Future. При POSTS_IMAGE_WORKERS = 0 — сразу, в текущем процессе.
+    Если такая же картинка уже есть у другой записи (posts.storage),
+    её варианты берутся готовыми, если их файлы на месте.
+    """
+    ready = Post.objects.filter(image=name).exclude(
+        image_variants='').values_list('image_variants', flat=True).first()
+    if ready and _stored(name, ready.split(',')):
+        mark_ready(post_id, name, ready.split(','))
+        return None
+    if not settings.POSTS_IMAGE_WORKERS:
+        mark_ready(post_id, name, generate_variants(name))
+        return None
+    future = executor().submit(generate_variants, name)
+    future.add_done_callback(
+        lambda future: _finished(post_id, name, future))
+    return future
+
+
+def picture(post):
+    """Источники <picture> для готовых вариантов картинки записи."""
+    widths = post.variant_widths
+    sources = []
+    for image_format in settings.POSTS_IMAGE_FORMATS:
+        urls = [(default_storage.url(
+            variant_name(post.image.name, width, image_format)), width)
+            for width in widths]
+        sources.append({
+            'type': MIME_TYPES[image_format],
+            'srcset': ', '.join(f'{url} {width}w' for url, width in urls),
+            'src': urls[-1][0],
+        })
+    return sources
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Нагрузить базу параллельными new_post и add_comment и '
+            'посчитать ошибки записи. Создаёт пользователя-бота и удаляет '
+            'его вместе с записями в конце')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на поток')
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username='write_benchmark_bot')
+        post = Post.objects.create(author=user, text='Запись для комментариев')
+        # первое имя из ALLOWED_HOSTS без шаблонов
+        host = next((host for host in settings.ALLOWED_HOSTS
+                     if '*' not in host and not host.startswith('.')),
+                    'testserver')
+        errors = Counter()
+        timings = []
+        lock = threading.Lock()
+
+        def worker(number):
+            client = Client(SERVER_NAME=host)
+            client.force_login(user)
+            for index in range(options['requests']):
+                if index % 2:
+                    url = reverse('add_comment', args=[user.username,
+                                                       post.id])
+                else:
+                    url = reverse('new_post')
+                started = time.perf_counter()
+                try:
+                    response = client.post(url, {'text': f'{number}-{index}'})
+                    result = response.status_code
+                except DatabaseError as error:
+                    result = str(error)
+                with lock:
+                    timings.append(time.perf_counter() - started)
+                    if result not in (200, 302):
+                        errors[result] += 1
+            connection.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=[number])
+                   for number in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        User.objects.filter(pk=user.pk).delete()
+
+        timings.sort()
+        total = len(timings)
+        self.stdout.write(
+            f'Запросов: {total} за {elapsed:.2f} с '
+            f'({total / elapsed:.0f} в секунду), '
+            f'p50 {timings[total // 2] * 1000:.0f} мс, '
+            f'p95 {timings[int(total * 0.95)] * 1000:.0f} мс')
+        self.stdout.write(f'Ошибок: {sum(errors.values())}')
+        for error, count in errors.most_common():
+            self.stdout.write(f'  {error}: {count}')
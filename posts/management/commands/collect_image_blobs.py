@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.blobs import collect, recount
+
+
+class Command(BaseCommand):
+    help = 'Удалить картинки, на которые не ссылается ни одна запись'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true',
+                            help='Сначала пересчитать ссылки по записям')
+        parser.add_argument('--grace', type=int,
+                            default=settings.POSTS_BLOB_GC_GRACE,
+                            help='Не трогать файлы моложе стольких секунд')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            recount()
+        collected = collect(options['grace'])
+        self.stdout.write(f'Удалено картинок: {len(collected)}')
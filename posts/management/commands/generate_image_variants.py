@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts.images import generate_variants, mark_described, mark_ready
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Подготовить варианты, размеры и заглушки картинок записей, '
+            'у которых их ещё нет')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Пересоздать варианты всех картинок')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image=None)
+        if not options['all']:
+            posts = posts.filter(image_variants='')
+        done = 0
+        for post_id, name in posts.values_list('id', 'image').iterator():
+            widths = generate_variants(name)
+            mark_ready(post_id, name, widths)
+            done += bool(widths)
+        self.stdout.write(f'Подготовлено картинок: {done}')
+        described = 0
+        posts = Post.objects.exclude(image='').exclude(image=None)
+        if not options['all']:
+            posts = posts.filter(image_width=None)
+        for post in posts.only('id', 'image').iterator():
+            described += mark_described(post.pk, post.image)
+        self.stdout.write(f'Описано картинок: {described}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать счётчики записей и подписок всех пользователей'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stats = rebuild()
+        self.stdout.write(f'Пересчитано пользователей: {len(stats)}')
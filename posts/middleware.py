@@ -0,0 +1,76 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+
+from .cache import ANY_FEED, get_versions, is_stale
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Кэш целых страниц для анонимных GET-запросов.
+
+    Стоит до сессий и аутентификации, поэтому попадание в кэш не трогает
+    ни сессию, ни БД, ни шаблоны. Сохраняются только ответы, помеченные
+    суррогатными ключами (posts.cache.tag_response), вместе с поколениями
+    этих ключей: как только сигнал Post/Comment/Group/Follow увеличит
+    поколение любого из них, страница считается сброшенной.
+
+    Поколения читаются после рендеринга, когда ключи уже известны, поэтому
+    страница сохраняется, только если за время рендеринга не изменилась
+    ни одна лента: иначе она могла собраться из старых данных, а
+    сохраниться с новыми поколениями. Ответ, в который попал устаревший
+    фрагмент (posts.cache.mark_stale), не сохраняется и лишается ETag у
+    любого читателя, чтобы браузер не подтверждал его ответом 304.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timeout = settings.POSTS_PAGE_CACHE_TIMEOUT
+        if not timeout or not self.is_cacheable_request(request):
+            return self.render(request)
+        key = self.page_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            response, keys, versions = entry
+            if get_versions(keys) == versions:
+                response['X-Page-Cache'] = 'HIT'
+                return get_conditional_response(
+                    request, etag=response.get('ETag'), response=response)
+        started = get_versions([ANY_FEED])
+        response = self.render(request)
+        if (request.method == 'GET' and not is_stale(request)
+                and self.is_cacheable_response(response)):
+            keys = response['Surrogate-Key'].split()
+            response['X-Page-Cache'] = 'MISS'
+            versions = get_versions(keys)
+            if get_versions([ANY_FEED]) == started:
+                cache.set(key, (response, keys, versions), timeout)
+        return response
+
+    def render(self, request):
+        response = self.get_response(request)
+        if is_stale(request) and response.has_header('ETag'):
+            del response['ETag']
+        return response
+
+    @staticmethod
+    def is_cacheable_request(request):
+        return (request.method in ('GET', 'HEAD')
+                and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+    @staticmethod
+    def is_cacheable_response(response):
+        return (response.status_code == 200
+                and not response.streaming
+                and response.has_header('Surrogate-Key')
+                and not response.cookies
+                and 'private' not in response.get('Cache-Control', ''))
+
+    @staticmethod
+    def page_key(request):
+        url = request.build_absolute_uri()
+        return 'page:' + hashlib.md5(url.encode()).hexdigest()
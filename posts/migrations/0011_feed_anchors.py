@@ -0,0 +1,39 @@
+# Generated by Django 2.2.6 on 2026-10-16 12:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Лента')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FeedAnchor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(verbose_name='Позиция от старейшей записи')),
+                ('pub_date', models.DateTimeField()),
+                ('post_id', models.PositiveIntegerField()),
+                ('feed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anchors', to='posts.FeedIndex')),
+            ],
+            options={
+                'ordering': ['feed', 'position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedanchor',
+            constraint=models.UniqueConstraint(fields=('feed', 'position'), name='feed_anchor_position'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.6 on 2026-10-16 13:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    """Посчитать счётчики для уже существующих пользователей."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    stats = {pk: UserStats(user_id=pk)
+             for pk in User.objects.values_list('pk', flat=True)}
+    counters = (
+        (Post.objects, 'author_id', 'posts_count'),
+        (Follow.objects, 'author_id', 'followers_count'),
+        (Follow.objects, 'user_id', 'following_count'),
+    )
+    for queryset, field, counter in counters:
+        rows = queryset.order_by().values(field).annotate(
+            total=models.Count('*')).values_list(field, 'total')
+        for pk, total in rows:
+            setattr(stats[pk], counter, total)
+    UserStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0012_timeline_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
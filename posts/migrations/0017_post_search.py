@@ -0,0 +1,30 @@
+# Generated by Django 2.2.6 on 2026-10-16 16:00
+
+from django.db import migrations
+
+from posts import search
+
+
+def create_index(apps, schema_editor):
+    if search.is_available(schema_editor.connection):
+        search.install(schema_editor.connection)
+        search.rebuild(schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    if search.is_available(schema_editor.connection):
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(
+                f'DROP TRIGGER IF EXISTS posts_post_fts_{trigger}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {search.FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 2.2.6 on 2026-10-16 17:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from posts.tags import parse_mentions, parse_tags
+
+
+def fill_tags(apps, schema_editor):
+    """Разобрать теги и упоминания уже опубликованных записей."""
+    Post = apps.get_model('posts', 'Post')
+    Hashtag = apps.get_model('posts', 'Hashtag')
+    PostTag = apps.get_model('posts', 'PostTag')
+    Mention = apps.get_model('posts', 'Mention')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    users = dict(User.objects.values_list('username', 'id'))
+    tags, mentions = [], []
+    for post_id, text, pub_date in Post.objects.values_list(
+            'id', 'text', 'pub_date').iterator():
+        tags += [(name, post_id, pub_date) for name in parse_tags(text)]
+        mentions += [Mention(user_id=users[username], post_id=post_id,
+                             pub_date=pub_date)
+                     for username in parse_mentions(text)
+                     if username in users]
+    Hashtag.objects.bulk_create(
+        [Hashtag(name=name) for name in {name for name, _, _ in tags}])
+    ids = dict(Hashtag.objects.values_list('name', 'id'))
+    PostTag.objects.bulk_create(
+        [PostTag(tag_id=ids[name], post_id=post_id, pub_date=pub_date)
+         for name, post_id, pub_date in tags])
+    Mention.objects.bulk_create(mentions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hashtag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Тег')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_entries', to='posts.Post')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='posts.Hashtag')),
+            ],
+            options={
+                'ordering': ['-pub_date', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Mention',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-pub_date', '-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', 'pub_date', 'id'], name='posts_tag_feed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='posttag',
+            constraint=models.UniqueConstraint(fields=('tag', 'post'), name='post_tag'),
+        ),
+        migrations.AddIndex(
+            model_name='mention',
+            index=models.Index(fields=['user', 'pub_date', 'id'], name='posts_mention_feed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='mention',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='mention'),
+        ),
+        migrations.RunPython(fill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-16 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Варианты изображения'),
+        ),
+    ]
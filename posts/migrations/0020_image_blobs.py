@@ -0,0 +1,41 @@
+# Generated by Django 2.2.6 on 2026-10-16 21:00
+
+from django.db import migrations, models
+from django.db.models import Count
+import posts.storage
+
+
+def count_blobs(apps, schema_editor):
+    """Посчитать ссылки на уже загруженные картинки."""
+    Post = apps.get_model('posts', 'Post')
+    ImageBlob = apps.get_model('posts', 'ImageBlob')
+    references = Post.objects.exclude(image='').exclude(image=None).values(
+        'image').annotate(references=Count('id')).order_by().values_list(
+        'image', 'references')
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=name, references=count)
+         for name, count in references])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Файл')),
+                ('references', models.IntegerField(default=0, verbose_name='Ссылок')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Добавьте изображение', null=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Изображение'),
+        ),
+        migrations.RunPython(count_blobs, migrations.RunPython.noop),
+    ]
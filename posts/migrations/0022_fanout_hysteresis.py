@@ -0,0 +1,31 @@
+# Generated by Django 2.2.6 on 2026-10-16 23:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_popular(apps, schema_editor):
+    UserStats = apps.get_model('posts', 'UserStats')
+    UserStats.objects.filter(
+        followers_count__gt=settings.POSTS_FANOUT_LIMIT).update(popular=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_post_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='follow',
+            name='backfilled',
+            field=models.BooleanField(default=True, verbose_name='Лента дополнена'),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='popular',
+            field=models.BooleanField(default=False, verbose_name='Популярный'),
+        ),
+        migrations.RunPython(mark_popular, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import image_storage
+
 User = get_user_model()
 
 
@@ -29,6 +31,12 @@ class Group(models.Model):
 
 
 class Post(models.Model):
+    COUNTER_FIELDS = ('comment_count',)
+    # поля, которые по картинке заполняют сигналы и пул процессов
+    # (posts.images); их пишет только сохранение с новой картинкой
+    IMAGE_FIELDS = ('image_variants', 'image_width', 'image_height',
+                    'image_placeholder')
+
     text = models.TextField(
         'Публикация',
         max_length=200,
@@ -57,18 +65,103 @@ class Post(models.Model):
     image = models.ImageField(
         verbose_name="Изображение",
         upload_to='posts/',
+        storage=image_storage,
         blank=True,
         null=True,
         help_text='Добавьте изображение')
+    # ширины готовых вариантов картинки через запятую (posts.images)
+    image_variants = models.CharField(
+        "Варианты изображения",
+        max_length=100,
+        blank=True,
+        default='',
+        editable=False,
+    )
+    # размеры картинки и крошечная заглушка для ленивой загрузки
+    # (posts.images.describe)
+    image_width = models.PositiveIntegerField(
+        "Ширина изображения",
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        "Высота изображения",
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_placeholder = models.TextField(
+        "Заглушка изображения",
+        blank=True,
+        default='',
+        editable=False,
+    )
+    # ключ кэша отрисованной карточки записи
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+    # меняется сигналами Comment, чтобы ленты не считали комментарии
+    comment_count = models.PositiveIntegerField(
+        "Комментариев",
+        default=0,
+        editable=False,
+    )
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            # ленты групп и авторов листаются по (pub_date, id)
+            models.Index(fields=['group', 'pub_date', 'id'],
+                         name='posts_group_feed_idx'),
+            models.Index(fields=['author', 'pub_date', 'id'],
+                         name='posts_author_feed_idx'),
+        ]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # картинка на момент чтения: по ней save() видит её замену
+        post._loaded_image = post.__dict__.get('image')
+        return post
+
+    def save(self, **kwargs):
+        # счётчики меняются сигналами через F(), а поля картинки — пулом
+        # процессов; полное сохранение загруженной записи (редактирование,
+        # админка) не должно затирать их значениями, прочитанными в
+        # начале запроса
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            skipped = self.COUNTER_FIELDS
+            if (hasattr(self, '_loaded_image')
+                    and (self._loaded_image or '') == (self.image.name or '')):
+                skipped += self.IMAGE_FIELDS
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped]
+        super().save(**kwargs)
+        self._loaded_image = self.image.name
+
+    @property
+    def variant_widths(self):
+        return [int(width) for width in self.image_variants.split(',')
+                if width]
+
+
+class ImageBlob(models.Model):
+    """Файл картинки в хранилище по содержимому и число записей с ним."""
+    name = models.CharField("Файл", max_length=100, unique=True)
+    references = models.IntegerField("Ссылок", default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.references}'
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
@@ -81,7 +174,12 @@ class Comment(models.Model):
     created = models.DateTimeField("Дата публикации", auto_now_add=True)
 
     class Meta:
-        ordering = ['-created']
+        ordering = ['-created', '-id']
+        indexes = [
+            # комментарии записи листаются курсором по (created, id)
+            models.Index(fields=['post', 'created', 'id'],
+                         name='posts_comment_page_idx'),
+        ]
 
     def __str__(self):
         return self.text[:10]
@@ -94,6 +192,9 @@ class Follow(models.Model):
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
                                related_name="following")
+    # в ленте подписчика есть последние записи автора; сбрасывается,
+    # когда автор перестаёт быть популярным (posts.timeline)
+    backfilled = models.BooleanField("Лента дополнена", default=True)
 
     def __str__(self):
         return f's{User:self.user.username}->@{User:self.author.username}'
@@ -104,3 +205,129 @@ class Follow(models.Model):
                                     name='follower')
         ]
         ordering = ['-user']
+
+
+class FeedIndex(models.Model):
+    """Число записей в ленте: общей, группы или автора."""
+    key = models.CharField("Лента", max_length=64, unique=True)
+    count = models.PositiveIntegerField("Записей", default=0)
+
+    def __str__(self):
+        return f'{self.key}: {self.count}'
+
+
+class FeedAnchor(models.Model):
+    """
+    Граница (pub_date, id) каждой K-й страницы ленты.
+
+    Позиция отсчитывается от самой старой записи, поэтому новые записи,
+    которые всегда попадают в начало ленты, якоря не сдвигают.
+    """
+    feed = models.ForeignKey(FeedIndex, on_delete=models.CASCADE,
+                             related_name="anchors")
+    position = models.PositiveIntegerField("Позиция от старейшей записи")
+    pub_date = models.DateTimeField()
+    post_id = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['feed', 'position'],
+                                    name='feed_anchor_position')
+        ]
+        ordering = ['feed', 'position']
+
+    def __str__(self):
+        return f'{self.feed.key}@{self.position}'
+
+
+class TimelineEntry(models.Model):
+    """Запись в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="timeline")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="timeline")
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='timeline_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='posts_timeline_idx'),
+        ]
+        ordering = ['-pub_date', '-post']
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые иначе считались бы на каждой странице."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name="stats")
+    posts_count = models.PositiveIntegerField("Записей", default=0)
+    followers_count = models.PositiveIntegerField("Подписчиков", default=0)
+    following_count = models.PositiveIntegerField("Подписок", default=0)
+    # записи не раскладываются по лентам подписчиков (posts.timeline)
+    popular = models.BooleanField("Популярный", default=False)
+
+    class Meta:
+        verbose_name = "Статистика пользователя"
+        verbose_name_plural = "Статистика пользователей"
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts_count}/{self.followers_count}'
+
+
+class Hashtag(models.Model):
+    """Хэштег в нормализованном виде: без «#» и в нижнем регистре."""
+    name = models.CharField("Тег", max_length=100, unique=True)
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """Вхождение тега в запись; pub_date копируется для ленты тега."""
+    tag = models.ForeignKey(Hashtag, on_delete=models.CASCADE,
+                            related_name="entries")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="tag_entries")
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'post'], name='post_tag')
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'pub_date', 'id'],
+                         name='posts_tag_feed_idx'),
+        ]
+        ordering = ['-pub_date', '-id']
+
+    def __str__(self):
+        return f'{self.tag_id}: {self.post_id}'
+
+
+class Mention(models.Model):
+    """Упоминание пользователя в записи; pub_date — для ленты упоминаний."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="mentions")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="mentions")
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='mention')
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'id'],
+                         name='posts_mention_feed_idx'),
+        ]
+        ordering = ['-pub_date', '-id']
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
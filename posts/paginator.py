@@ -0,0 +1,150 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .anchors import get_numbered_page
+
+
+class CursorPage(Sequence):
+    """Страница ленты, выбранная по курсору, а не по номеру."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0])
+
+
+class CursorPaginator:
+    """
+    Постраничный вывод без COUNT(*) и OFFSET.
+
+    Записи упорядочены по убыванию пары (field, pk), а страница выбирается
+    условием «строго старше/новее курсора», поэтому каждая страница стоит
+    одного диапазонного прохода по индексу независимо от глубины.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, field='pub_date'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.field = field
+
+    def cursor_value(self, obj):
+        """Значение ``field`` записи в виде строки для курсора."""
+        return getattr(obj, self.field).isoformat()
+
+    def parse_cursor_value(self, value):
+        """Обратно к cursor_value: значение, None или ValueError."""
+        return parse_datetime(value)
+
+    def encode_cursor(self, obj):
+        raw = f'{self.cursor_value(obj)}|{obj.pk}'
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Вернуть пару (значение, pk) или None, если курсор испорчен."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = urlsafe_b64decode(padded.encode()).decode()
+            value, pk = raw.rsplit('|', 1)
+            value, pk = self.parse_cursor_value(value), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            return None
+        if value is None:
+            return None
+        return value, pk
+
+    def seek(self, value, pk, older=True):
+        """Записи строго старше (или новее) позиции (value, pk)."""
+        field = self.field
+        if older:
+            condition = (Q(**{f'{field}__lt': value})
+                         | Q(**{field: value, 'pk__lt': pk}))
+            ordering = (f'-{field}', '-pk')
+        else:
+            condition = (Q(**{f'{field}__gt': value})
+                         | Q(**{field: value, 'pk__gt': pk}))
+            ordering = (field, 'pk')
+        return self.object_list.filter(condition).order_by(*ordering)
+
+    def get_page(self, after=None, before=None):
+        """
+        Вернуть страницу после курсора ``after`` или перед ``before``.
+        Испорченный курсор, как и у Paginator.get_page, даёт первую страницу.
+        """
+        per_page = self.per_page
+        position = self.decode_cursor(before) if before else None
+        if position is not None:
+            rows = self.rows(position, older=False, limit=per_page + 1)
+            if rows:
+                return CursorPage(rows[:per_page][::-1], self,
+                                  has_next=True,
+                                  has_previous=len(rows) > per_page)
+        position = self.decode_cursor(after) if after else None
+        rows = self.rows(position, limit=per_page + 1)
+        return CursorPage(rows[:per_page], self,
+                          has_next=len(rows) > per_page,
+                          has_previous=position is not None)
+
+    def rows(self, position=None, older=True, limit=None):
+        """Не больше ``limit`` записей старше (новее) позиции или с начала."""
+        if position is None:
+            queryset = self.object_list.order_by(f'-{self.field}', '-pk')
+        else:
+            queryset = self.seek(*position, older=older)
+        return list(queryset[:limit])
+
+
+def get_page(request, object_list, per_page=None, feed=None,
+             cursor_paginator=CursorPaginator):
+    """
+    Вернуть (page, paginator) для ленты записей.
+
+    Параметры ``after``/``before`` в запросе (или POSTS_CURSOR_PAGINATION)
+    включают курсорный режим, иначе используется обычный ``?page=N``;
+    для ленты с ключом ``feed`` номер страницы ищется по якорному индексу.
+    """
+    per_page = per_page or settings.POSTS_PER_PAGE
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before or settings.POSTS_CURSOR_PAGINATION:
+        paginator = cursor_paginator(object_list, per_page)
+        return paginator.get_page(after=after, before=before), paginator
+    if feed is not None:
+        return get_numbered_page(feed, object_list,
+                                 request.GET.get('page'), per_page)
+    paginator = Paginator(object_list, per_page)
+    return paginator.get_page(request.GET.get('page')), paginator
@@ -0,0 +1,108 @@
+"""
+Уменьшенные копии картинок записей по запросу.
+
+/media/resized/<w>/<path> уменьшает картинку при первом обращении и
+кладёт результат в MEDIA_ROOT/resized/<w>/<path>, откуда его может
+отдавать и сам веб-сервер. Ширины ограничены POSTS_RESIZE_WIDTHS, чтобы
+перебором размеров нельзя было забить диск, а объём каталога —
+POSTS_RESIZE_CACHE_BYTES: при превышении удаляются файлы, к которым
+дольше всего не обращались (время обращения хранится в mtime).
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils._os import safe_join
+from PIL import Image
+
+# Примерный объём каталога в этом процессе; точный пересчитывается
+# обходом каталога, когда примерный выходит за бюджет
+_estimated_bytes = None
+
+
+def cache_root():
+    return os.path.join(settings.MEDIA_ROOT, 'resized')
+
+
+def cached_path(width, name):
+    """Путь копии; SuspiciousFileOperation для путей вне каталога."""
+    return safe_join(cache_root(), str(width), name)
+
+
+def touch(path):
+    """Отметить обращение к копии для LRU."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def resize(name, width):
+    """
+    Уменьшить картинку ``name`` до ``width`` и вернуть копию, открытую
+    на чтение: её можно отдать, даже если соседний запрос уже вытеснил
+    файл из каталога.
+    """
+    path = cached_path(width, name)
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image_format = image.format
+        if image.width > width:
+            height = max(round(image.height * width / image.width), 1)
+            image = image.resize((width, height), Image.LANCZOS)
+        else:
+            image.load()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # пишем во временный файл рядом и подменяем атомарно, чтобы
+        # параллельный запрос не отдал недописанную копию
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                image.save(output, image_format)
+            copy = open(temp, 'rb')
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+    _account(os.fstat(copy.fileno()).st_size)
+    return copy
+
+
+def _files():
+    for directory, _, names in os.walk(cache_root()):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield stat.st_mtime, stat.st_size, path
+
+
+def _account(size):
+    global _estimated_bytes
+    if _estimated_bytes is None:
+        _estimated_bytes = sum(size for _, size, _ in _files())
+    else:
+        _estimated_bytes += size
+    if _estimated_bytes > settings.POSTS_RESIZE_CACHE_BYTES:
+        _estimated_bytes = evict()
+
+
+def evict():
+    """
+    Удалять самые давние копии, пока каталог не уложится в бюджет
+    с запасом в десятую часть, и вернуть получившийся объём.
+    """
+    files = sorted(_files())
+    total = sum(size for _, size, _ in files)
+    target = settings.POSTS_RESIZE_CACHE_BYTES * 0.9
+    for _, size, path in files:
+        if total <= target:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    return total
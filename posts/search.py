@@ -0,0 +1,147 @@
+"""
+Полнотекстовый поиск по записям на SQLite FTS5.
+
+Таблица posts_post_fts — внешний индекс по posts_post.text: строк она не
+хранит, а триггеры в самой базе поддерживают её при любых изменениях,
+включая queryset.update() и удаления каскадом. Результаты упорядочены
+по bm25 и листаются курсором (score, id), поэтому глубокие страницы
+стоят столько же, сколько первая.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .paginator import CursorPaginator
+
+FTS_TABLE = 'posts_post_fts'
+
+# Триггеры пропадают, когда миграция пересоздаёт posts_post, поэтому
+# install() повторяется после каждого migrate (см. signals.install_search)
+INSTALL_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete
+        AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_post_fts_update
+        AFTER UPDATE OF text ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);
+        END""",
+]
+
+# Границы совпадений в сниппете: символы, которых нет в тексте записей,
+# чтобы сам текст можно было безопасно экранировать
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+
+def is_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(using=connection):
+    with using.cursor() as cursor:
+        for sql in INSTALL_SQL:
+            cursor.execute(sql)
+
+
+def rebuild(using=connection):
+    """Переиндексировать все записи."""
+    with using.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(query):
+    """
+    Запрос читателя как выражение MATCH: все слова, каждое по префиксу.
+    Операторы FTS5 из ввода не пропускаются, поэтому синтаксических
+    ошибок не бывает.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+def matching_ids(query):
+    """Подзапрос id записей, подходящих под ``query``, для filter()."""
+    return RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                  [match_expression(query)])
+
+
+def highlight(snippet):
+    return mark_safe(escape(snippet).replace(
+        MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+class SearchPaginator(CursorPaginator):
+    """
+    Курсорные страницы результатов поиска, лучшие первыми.
+
+    Позиция в курсоре — пара (score, id) вместо (pub_date, id); «старше»
+    здесь значит «хуже подходит». Записи на странице получают атрибуты
+    ``search_score`` (bm25, чем меньше, тем лучше) и ``snippet`` —
+    фрагмент текста с подсветкой.
+    """
+
+    def __init__(self, query, per_page):
+        super().__init__(Post.objects.select_related('author', 'group'),
+                         per_page, field='search_score')
+        self.query = query
+        self.match = match_expression(query)
+
+    def cursor_value(self, obj):
+        return repr(obj.search_score)
+
+    def parse_cursor_value(self, value):
+        return float(value)
+
+    def rows(self, position=None, older=True, limit=None):
+        if not self.match:
+            return []
+        return self._posts(self._rows(position, older, limit))
+
+    def _rows(self, position, worse=True, limit=None):
+        sql = [f"""
+            SELECT id, score, snippet FROM (
+                SELECT rowid AS id, bm25({FTS_TABLE}) AS score,
+                       snippet({FTS_TABLE}, 0, %s, %s, '…', 24) AS snippet
+                FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s
+            ) ranked"""]
+        params = [MARK_START, MARK_END, self.match]
+        if position is not None:
+            op = '>' if worse else '<'
+            sql.append(f'WHERE score {op} %s OR (score = %s AND id {op} %s)')
+            score, pk = position
+            params += [score, score, pk]
+        sql.append('ORDER BY score, id' if worse
+                   else 'ORDER BY score DESC, id DESC')
+        sql.append('LIMIT %s')
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(' '.join(sql), params)
+            return cursor.fetchall()
+
+    def _posts(self, rows):
+        posts = self.object_list.in_bulk([row[0] for row in rows])
+        result = []
+        for pk, score, snippet in rows:
+            # запись могли удалить между поиском по индексу и выборкой
+            post = posts.get(pk)
+            if post is None:
+                continue
+            post.search_score = score
+            post.snippet = highlight(snippet)
+            result.append(post)
+        return result
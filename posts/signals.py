@@ -0,0 +1,209 @@
+from functools import partial
+
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import blobs, cache, images, search, stats, tags, timeline
+from .anchors import author_feed, feed_changed, feed_keys, group_feed
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    """
+    Запомнить группу, текст и картинку до редактирования, чтобы поправить
+    ленту группы и не обрабатывать заново неизменённые текст и картинку.
+    """
+    instance._previous_group_id = None
+    instance._previous_text = None
+    instance._previous_image = None
+    if instance.pk is not None:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'text', 'image').first()
+        if previous is not None:
+            (instance._previous_group_id, instance._previous_text,
+             instance._previous_image) = previous
+
+
+@receiver(pre_save, sender=Post)
+def describe_image(sender, instance, **kwargs):
+    """Размеры и заглушка новой картинки, чтобы карточка не прыгала."""
+    name = instance.image.name or None
+    if name != (getattr(instance, '_previous_image', None) or None):
+        (instance.image_width, instance.image_height,
+         instance.image_placeholder) = images.describe(instance.image)
+
+
+@receiver(pre_save, sender=Post)
+def reset_image_variants(sender, instance, **kwargs):
+    """Варианты прежней картинки новой не подходят: их готовят заново."""
+    name = instance.image.name or None
+    if name != (getattr(instance, '_previous_image', None) or None):
+        instance.image_variants = ''
+
+
+@receiver(post_save, sender=Post)
+def update_feed_anchors(sender, instance, created, **kwargs):
+    if created:
+        feed_changed(feed_keys(instance.author_id, instance.group_id),
+                     instance, 1)
+        return
+    previous = getattr(instance, '_previous_group_id', None)
+    if previous == instance.group_id:
+        return
+    if previous is not None:
+        feed_changed([group_feed(previous)], instance, -1)
+    if instance.group_id is not None:
+        feed_changed([group_feed(instance.group_id)], instance, 1)
+
+
+@receiver(post_delete, sender=Post)
+def drop_feed_anchors(sender, instance, **kwargs):
+    feed_changed(feed_keys(instance.author_id, instance.group_id),
+                 instance, -1)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    stats.change(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.author_id, followers_count=1)
+        stats.change(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    stats.change(instance.author_id, followers_count=-1)
+    stats.change(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+        timeline.forget_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def forget_post(sender, instance, **kwargs):
+    timeline.forget_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.mark_popular(instance.author_id)
+        timeline.backfill(instance.user_id, instance.author_id)
+        timeline.forget_following(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.forget_following(instance.user_id)
+    timeline.mark_unpopular(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_tags(sender, instance, created, **kwargs):
+    if created or instance.text != getattr(instance, '_previous_text', None):
+        tags.index_post(instance, created)
+
+
+@receiver(post_save, sender=Post)
+def prepare_image_variants(sender, instance, **kwargs):
+    name = instance.image.name
+    if name and name != getattr(instance, '_previous_image', None):
+        transaction.on_commit(partial(images.schedule, instance.pk, name))
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, **kwargs):
+    name = instance.image.name or None
+    previous = getattr(instance, '_previous_image', None) or None
+    if name != previous:
+        if name:
+            blobs.acquire(name)
+        if previous:
+            blobs.release(previous)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    if instance.image.name:
+        blobs.release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=F('comment_count') - 1)
+
+
+@receiver(post_save, sender=Post)
+def bump_post_feeds(sender, instance, **kwargs):
+    feeds = feed_keys(instance.author_id, instance.group_id)
+    previous = getattr(instance, '_previous_group_id', None)
+    if previous is not None:
+        feeds.append(group_feed(previous))
+    cache.bump(cache.post_feed(instance.pk), *feeds)
+
+
+@receiver(post_delete, sender=Post)
+def bump_deleted_post_feeds(sender, instance, **kwargs):
+    cache.bump(cache.post_feed(instance.pk),
+               *feed_keys(instance.author_id, instance.group_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_feeds(sender, instance, **kwargs):
+    post = Post.objects.filter(pk=instance.post_id).values_list(
+        'author_id', 'group_id').first()
+    if post is not None:
+        cache.bump(cache.post_feed(instance.post_id), *feed_keys(*post))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_feed(sender, instance, **kwargs):
+    cache.bump(group_feed(instance.pk), cache.GROUPS)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follower_feed(sender, instance, **kwargs):
+    # счётчики подписок в карточках обоих пользователей тоже меняются
+    cache.bump(cache.follower_feed(instance.user_id),
+               author_feed(instance.author_id),
+               author_feed(instance.user_id))
+
+
+@receiver(post_migrate)
+def install_search(sender, using, **kwargs):
+    """Вернуть триггеры поиска, если миграция пересоздала posts_post."""
+    connection = connections[using]
+    if sender.name != 'posts' or not search.is_available(connection):
+        return
+    if search.FTS_TABLE in connection.introspection.table_names():
+        search.install(connection)
@@ -0,0 +1,75 @@
+"""
+Защита кэша от лавины пересчётов.
+
+Когда горячая запись устаревает, её пересчитывает только тот запрос,
+который первым взял короткую блокировку в кэше; остальные в это время
+получают прежнее значение (stale-while-revalidate). Чтобы пересчёт
+чаще всего начинался ещё до истечения записи, каждый читатель с
+вероятностью, растущей к концу срока, сам берётся за него заранее
+(алгоритм XFetch: чем дольше считается значение, тем раньше).
+"""
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Сколько ждать чужого пересчёта, если отдать пока нечего
+WAIT_STEP = 0.05
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def _is_fresh(entry, version, now):
+    entry_version, _, delta, expires = entry
+    if entry_version != version:
+        return False
+    beta = settings.POSTS_CACHE_EARLY_REFRESH
+    return now - delta * beta * math.log(1 - random.random()) < expires
+
+
+def _compute(key, compute, timeout, version):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    if timeout is None:
+        entry = (version, value, delta, math.inf)
+    else:
+        entry = (version, value, delta, time.time() + timeout)
+        timeout += settings.POSTS_CACHE_STALE_TIMEOUT
+    cache.set(key, entry, timeout)
+    return value
+
+
+def get_or_compute(key, compute, timeout, version=None, on_stale=None):
+    """
+    Значение ``compute()`` из кэша по ``key``.
+
+    ``version`` — поколение данных: запись другого поколения считается
+    устаревшей, но может быть отдана, пока её пересчитывает другой запрос.
+    Тогда перед возвратом вызывается ``on_stale()``.
+    """
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(entry, version, time.time()):
+        return entry[1]
+    lock = lock_key(key)
+    if cache.add(lock, True, settings.POSTS_CACHE_LOCK_TIMEOUT):
+        try:
+            return _compute(key, compute, timeout, version)
+        finally:
+            cache.delete(lock)
+    if entry is not None:
+        if on_stale is not None:
+            on_stale()
+        return entry[1]
+    # отдать нечего: ждём соседа, но не дольше срока его блокировки
+    deadline = time.monotonic() + settings.POSTS_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline and cache.get(lock) is not None:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+    return _compute(key, compute, timeout, version)
@@ -0,0 +1,80 @@
+"""
+Денормализованные счётчики пользователей.
+
+Счётчики меняются сигналами в той же транзакции, что и Post/Follow
+(изменяющие представления обёрнуты в transaction.atomic), а при
+расхождении пересчитываются командой ``rebuild_user_stats``.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Follow, Post, User, UserStats
+
+
+def _count(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+        field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _rows(users):
+    return users.annotate(
+        stats_posts=_count(Post.objects, 'author'),
+        stats_followers=_count(Follow.objects, 'author'),
+        stats_following=_count(Follow.objects, 'user'),
+    ).values_list('pk', 'stats_posts', 'stats_followers', 'stats_following')
+
+
+def rebuild(users=None):
+    """Пересчитать счётчики пользователей (по умолчанию всех)."""
+    users = User.objects.all() if users is None else users
+    stats = [UserStats(user_id=pk, posts_count=posts,
+                       followers_count=followers, following_count=following)
+             for pk, posts, followers, following in _rows(users)]
+    UserStats.objects.filter(user__in=users).delete()
+    UserStats.objects.bulk_create(stats)
+    return stats
+
+
+def _create(user_id):
+    """
+    Завести строку счётчиков, посчитав их с нуля, и вернуть
+    (stats, created). Если строку одновременно завёл другой запрос,
+    get_or_create вернёт её, а не упадёт с IntegrityError.
+    """
+    _, posts, followers, following = _rows(
+        User.objects.filter(pk=user_id)).get()
+    return UserStats.objects.get_or_create(user_id=user_id, defaults={
+        'posts_count': posts,
+        'followers_count': followers,
+        'following_count': following,
+    })
+
+
+def _shift(user_id, deltas):
+    return UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()})
+
+
+def change(user_id, **deltas):
+    """
+    Сдвинуть счётчики пользователя.
+
+    Если строки ещё нет, она считается с нуля, но только при росте
+    счётчиков: уменьшение приходит и при каскадном удалении пользователя.
+    """
+    if _shift(user_id, deltas) or not any(
+            delta > 0 for delta in deltas.values()):
+        return
+    _, created = _create(user_id)
+    if not created:
+        # строку завёл другой запрос, и нашего изменения он не видел
+        _shift(user_id, deltas)
+
+
+def get_stats(user):
+    """Счётчики пользователя, выбранного с select_related('stats')."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return _create(user.pk)[0]
@@ -0,0 +1,66 @@
+"""
+Хранилище картинок записей с именами по содержимому.
+
+Файл называется по SHA-256 своего содержимого: posts/ab/ab12…ef.jpg.
+Одинаковые картинки (перепосты мемов) лежат на диске в одном экземпляре,
+а варианты и миниатюры, привязанные к имени файла, готовятся для них
+один раз. Сколько записей ссылается на файл, считает модель ImageBlob,
+а ненужные файлы удаляет команда collect_image_blobs (posts.blobs).
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Имя файла в хранилище: sha256 и расширение исходного файла
+BLOB_RE = re.compile(r'^[0-9a-f]{64}(\.\w+)?$')
+
+
+def blob_name(directory, digest, extension):
+    """posts, ab12…ef, .jpg -> posts/ab/ab12…ef.jpg"""
+    return '/'.join(filter(None, [directory, digest[:2],
+                                  digest + extension]))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, который сохраняет каждое содержимое один раз."""
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        # хэш считается при записи во временный файл, так что загрузка
+        # читается один раз и целиком в памяти не держится
+        digest = hashlib.sha256()
+        fd, temp = tempfile.mkstemp(dir=full_directory)
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+            name = blob_name(directory.replace('\\', '/'),
+                             digest.hexdigest(), extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.unlink(temp)
+                # свежая mtime не даёт сборщику удалить файл, пока
+                # новая запись с ним ещё не сохранена
+                os.utime(full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp, self.file_permissions_mode)
+                os.replace(temp, full_path)
+        except BaseException:
+            if os.path.exists(temp):
+                os.unlink(temp)
+            raise
+        return name
+
+
+image_storage = ContentAddressedStorage()
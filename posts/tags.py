@@ -0,0 +1,74 @@
+"""
+Хэштеги и упоминания в тексте записей.
+
+Текст разбирается один раз при сохранении записи, а ленты тегов и
+упоминаний читаются из таблиц PostTag и Mention по индексу
+(тег, pub_date, id) — как ленты групп, без просмотра текстов.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .comments import attach_latest_comments
+from .models import Hashtag, Mention, PostTag
+from .paginator import CursorPaginator
+from .thumbnails import attach_thumbnails
+
+User = get_user_model()
+
+TAG_RE = re.compile(r'(?<![\w&#])#(\w{1,100})')
+# в имени пользователя Django допустимы буквы, цифры и @.+-_,
+# но точка или дефис в конце — это уже пунктуация
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.@+-]*\w)')
+
+
+def normalize_tag(name):
+    return name.lower()
+
+
+def parse_tags(text):
+    """Нормализованные теги текста без повторов, в порядке появления."""
+    return list(dict.fromkeys(
+        normalize_tag(name) for name in TAG_RE.findall(text)))
+
+
+def parse_mentions(text):
+    return list(dict.fromkeys(MENTION_RE.findall(text)))
+
+
+def index_post(post, created=False):
+    """Заново записать теги и упоминания записи."""
+    names = parse_tags(post.text)
+    if not created:
+        PostTag.objects.filter(post=post).delete()
+    if names:
+        Hashtag.objects.bulk_create(
+            [Hashtag(name=name) for name in names], ignore_conflicts=True)
+        PostTag.objects.bulk_create(
+            PostTag(tag=tag, post=post, pub_date=post.pub_date)
+            for tag in Hashtag.objects.filter(name__in=names))
+    usernames = parse_mentions(post.text)
+    if not created:
+        Mention.objects.filter(post=post).delete()
+    if usernames:
+        Mention.objects.bulk_create(
+            Mention(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in User.objects.filter(
+                username__in=usernames).values_list('id', flat=True))
+
+
+def entries_page(request, entries):
+    """
+    Страница ленты тега или упоминаний по курсору.
+
+    Листаются строки индекса по (pub_date, id), а записи с авторами и
+    группами подтягиваются тем же запросом.
+    """
+    paginator = CursorPaginator(
+        entries.select_related('post__author', 'post__group'),
+        settings.POSTS_PER_PAGE)
+    page = paginator.get_page(after=request.GET.get('after'),
+                              before=request.GET.get('before'))
+    attach_thumbnails(attach_latest_comments([entry.post for entry in page]))
+    return page, paginator
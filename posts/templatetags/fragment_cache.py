@@ -0,0 +1,69 @@
+from functools import partial
+
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from posts.cache import mark_stale
+from posts.singleflight import get_or_compute
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, name, vary_on, version):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.vary_on = vary_on
+        self.version = version
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        if timeout is not None:
+            try:
+                timeout = int(timeout)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    f'"fragment_cache" tag got a non-integer timeout '
+                    f'value: {timeout!r}')
+        key = make_template_fragment_key(
+            self.name, [var.resolve(context) for var in self.vary_on])
+        version = None
+        if self.version is not None:
+            version = self.version.resolve(context)
+        request = context.get('request')
+        on_stale = None
+        if request is not None:
+            on_stale = partial(mark_stale, request)
+        return get_or_compute(key, lambda: self.nodelist.render(context),
+                              timeout, version, on_stale)
+
+
+@register.tag
+def fragment_cache(parser, token):
+    """
+    ``{% cache %}`` с защитой от лавины пересчётов (posts.singleflight).
+
+        {% fragment_cache timeout name [vary_on ...] [version=expr] %}
+        ...
+        {% endfragment_cache %}
+
+    Фрагмент другого ``version`` пересчитывается одним запросом, а
+    остальные тем временем получают прежний.
+    """
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments.")
+    version = None
+    if tokens[-1].startswith('version='):
+        version = parser.compile_filter(tokens.pop()[len('version='):])
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        version,
+    )
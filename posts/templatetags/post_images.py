@@ -0,0 +1,21 @@
+from django import template
+
+from posts.images import picture
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/picture.html')
+def post_picture(post, eager=False):
+    """
+    <picture> с вариантами картинки записи, если они уже готовы.
+    Картинка грузится лениво, кроме ``eager`` — первой в ленте, которая
+    обычно видна сразу; до загрузки место под неё с известными
+    размерами занимает размытая заглушка.
+    """
+    return {'post': post,
+            'eager': eager,
+            'sources': picture(post) if post.variant_widths else None,
+            'width': post.image_width,
+            'height': post.image_height,
+            'placeholder': post.image_placeholder}
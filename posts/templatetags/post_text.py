@@ -0,0 +1,27 @@
+from django import template
+from django.urls import reverse
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from posts.tags import MENTION_RE, TAG_RE, normalize_tag
+
+register = template.Library()
+
+
+def _tag_link(match):
+    url = reverse('tag_posts', args=[normalize_tag(match[1])])
+    return f'<a href="{url}">{match[0]}</a>'
+
+
+def _mention_link(match):
+    url = reverse('profile', args=[match[1]])
+    return f'<a href="{url}">{match[0]}</a>'
+
+
+@register.filter(needs_autoescape=True)
+def tag_links(text, autoescape=True):
+    """Сделать #теги и @упоминания в тексте записи ссылками."""
+    if autoescape:
+        text = conditional_escape(text)
+    text = TAG_RE.sub(_tag_link, text)
+    return mark_safe(MENTION_RE.sub(_mention_link, text))
@@ -0,0 +1,72 @@
+import os
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import blobs
+from posts.models import ImageBlob, Post
+from posts.storage import image_storage
+from posts.tests.utils import TempMediaMixin, image_file, run_on_commit
+
+User = get_user_model()
+# уже 320 точек, но ещё не 640: у картинки один вариант
+SIZE = (400, 200)
+
+
+@override_settings(POSTS_IMAGE_WORKERS=0)
+class ImageBlobTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Reposter')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def publish(self, text, image):
+        with run_on_commit():
+            self.client.post(reverse('new_post'),
+                             {'text': text, 'image': image})
+        return Post.objects.get(text=text)
+
+    def test_same_image_is_stored_once(self):
+        """Перепост той же картинки не создаёт новый файл."""
+        first = self.publish('Мем', image_file('meme.png', SIZE))
+        second = self.publish('Репост', image_file('copy.png', SIZE))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}'
+                                           r'\.png$')
+        self.assertEqual(ImageBlob.objects.get().references, 2)
+        self.assertEqual(second.image_variants, first.image_variants)
+        other = self.publish('Другой', image_file('meme.png', SIZE, 'blue'))
+        self.assertNotEqual(other.image.name, first.image.name)
+
+    def test_missing_variants_are_not_shared(self):
+        """Чужие ширины без файлов вариантов не копируются."""
+        first = self.publish('Мем', image_file('meme.png', SIZE))
+        Post.objects.filter(pk=first.pk).update(image_variants='320,1280')
+        second = self.publish('Репост', image_file('copy.png', SIZE))
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(second.variant_widths, [320])
+
+    def test_unreferenced_image_is_collected(self):
+        post = self.publish('Мем', image_file('meme.png', SIZE))
+        name = post.image.name
+        path = image_storage.path(name)
+        Post.objects.filter(pk=post.pk).delete()
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 0)
+        self.assertEqual(blobs.collect(grace=3600), [])
+        self.assertTrue(os.path.exists(path))
+        out = StringIO()
+        call_command('collect_image_blobs', grace=0, stdout=out)
+        self.assertIn('Удалено картинок:', out.getvalue())
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_referenced_image_survives_recount(self):
+        post = self.publish('Мем', image_file('meme.png', SIZE))
+        ImageBlob.objects.update(references=0)
+        self.assertEqual(blobs.collect(grace=0), [])
+        blobs.recount()
+        self.assertEqual(ImageBlob.objects.get(name=post.image.name)
+                         .references, 1)
@@ -0,0 +1,173 @@
+import multiprocessing
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from yatube.cache import SQLiteCache, TieredCache
+
+
+def _incr_many(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def test_basic_operations(self):
+        self.cache.set('post', {'text': 'Текст'})
+        self.assertEqual(self.cache.get('post'), {'text': 'Текст'})
+        self.assertFalse(self.cache.add('post', 'другой'))
+        self.assertTrue(self.cache.add('new', 1))
+        self.cache.set('gone', 1, timeout=-1)
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertTrue(self.cache.add('gone', 2))
+        self.assertTrue(self.cache.delete('post'))
+        self.assertIsNone(self.cache.get('post'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_add_replaces_expired_entry(self):
+        """Просроченная запись не мешает add — на этом держатся блокировки."""
+        self.cache.set('lock', 1, timeout=-1)
+        self.assertTrue(self.cache.add('lock', 2))
+        self.assertEqual(self.cache.get('lock'), 2)
+
+    def test_values_are_shared_between_instances(self):
+        """Другой процесс видит те же записи через тот же файл."""
+        self.cache.set('shared', [1, 2])
+        other = SQLiteCache(self.location, {})
+        self.assertEqual(other.get('shared'), [1, 2])
+        other.clear()
+        self.assertIsNone(self.cache.get('shared'))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = SQLiteCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 3}})
+        for key in 'abc':
+            cache.set(key, key)
+        cache._connection().execute(
+            "UPDATE cache SET accessed = accessed - 10 WHERE key != ':1:a'")
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertEqual(cache.get('a'), 'a')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('d'), 'd')
+
+    def statements(self, cache):
+        statements = []
+        cache._connection().set_trace_callback(statements.append)
+        self.addCleanup(cache._connection().set_trace_callback, None)
+        return statements
+
+    def test_many_keys_in_one_query(self):
+        """get_many читает все ключи одним запросом."""
+        self.cache.set_many({'a': 1, 'b': [2], 'gone': 3})
+        self.cache.set('gone', 3, timeout=-1)
+        statements = self.statements(self.cache)
+        self.assertEqual(self.cache.get_many(['a', 'b', 'gone', 'missing']),
+                         {'a': 1, 'b': [2]})
+        self.assertEqual(
+            [sql for sql in statements if sql.startswith('SELECT')],
+            ["SELECT key, value, expires, accessed FROM cache WHERE key IN "
+             "(':1:a', ':1:b', ':1:gone', ':1:missing')"])
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_overflow_is_checked_periodically(self):
+        """COUNT(*) обходит таблицу, поэтому не выполняется на каждую
+        вставку."""
+        cache = SQLiteCache(self.location, {'OPTIONS': {'MAX_ENTRIES': 1000}})
+        statements = self.statements(cache)
+        for i in range(20):
+            cache.set(f'key{i}', i)
+        counts = [sql for sql in statements if 'COUNT(*)' in sql]
+        self.assertEqual(len(counts), 2)
+
+    def test_incr_is_atomic_across_processes(self):
+        """Параллельные incr из разных процессов не теряют обновлений."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_incr_many,
+                                   args=(self.location, 50))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.l2 = SQLiteCache(os.path.join(directory.name, 'l2.sqlite3'), {})
+        self.options = {
+            'CHANGELOG': os.path.join(directory.name, 'changes.log'),
+            'L1_MAX_ENTRIES': 2,
+        }
+        patcher = mock.patch.object(TieredCache, 'l2', self.l2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def worker(self, **options):
+        return TieredCache(None, {'OPTIONS': {**self.options, **options}})
+
+    def test_hot_keys_are_served_from_l1(self):
+        cache = self.worker()
+        cache.set('version', 1)
+        other = self.worker()
+        self.assertEqual(other.get('version'), 1)
+        self.assertEqual(other.get('version'), 1)
+        self.assertEqual(other.get('missing'), None)
+        self.assertEqual(other.stats(), {
+            'l1': {'hits': 1, 'misses': 2},
+            'l2': {'hits': 1, 'misses': 1},
+        })
+
+    def test_changes_are_broadcast_to_other_workers(self):
+        """Изменение в одном воркере выбрасывает ключ из L1 остальных."""
+        first, second = self.worker(), self.worker()
+        first.set('version', 1)
+        self.assertEqual(second.get_many(['version']), {'version': 1})
+        first.incr('version')
+        self.assertEqual(second.get('version'), 2)
+        first.delete('version')
+        self.assertIsNone(second.get('version'))
+
+    def test_change_during_l2_read_is_not_kept_in_l1(self):
+        """Значение, изменённое во время чтения из L2, не остаётся в L1."""
+        def get(*args, **kwargs):
+            value = real_get(*args, **kwargs)
+            cache.incr('version')
+            return value
+
+        cache = self.worker()
+        self.l2.set('version', 1)
+        real_get = self.l2.get
+        with mock.patch.object(self.l2, 'get', get):
+            self.assertEqual(cache.get('version'), 1)
+        self.assertEqual(cache.get('version'), 2)
+
+    def test_rotated_changelog_clears_l1(self):
+        first = self.worker(CHANGELOG_MAX_BYTES=1)
+        second = self.worker()
+        first.set('version', 1)
+        second.get('version')
+        self.l2.set('version', 5)
+        first.set('other', 1)
+        self.assertEqual(second.get('version'), 5)
+
+    def test_l1_is_bounded(self):
+        cache = self.worker()
+        for key in 'abc':
+            cache.set(key, key)
+        self.assertEqual(list(cache._l1), [':1:b', ':1:c'])
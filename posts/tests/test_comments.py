@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.comments import attach_latest_comments
+from posts.forms import PostForm
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class CommentPreviewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Commenter')
+        cls.posts = [Post.objects.create(author=cls.user, text=f'Текст{i}')
+                     for i in range(4)]
+        for post in cls.posts[:3]:
+            for i in range(5):
+                Comment.objects.create(post=post, author=cls.user,
+                                       text=f'Комментарий{i}')
+
+    def test_comment_count_follows_comments(self):
+        post = self.posts[0]
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 5)
+        post.comments.first().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 4)
+
+    def test_edit_keeps_comments_counted_meanwhile(self):
+        """Комментарий, добавленный во время правки, не теряется."""
+        post = Post.objects.get(pk=self.posts[3].pk)
+        Comment.objects.create(post=post, author=self.user, text='Новый')
+        form = PostForm({'text': 'Исправленный'}, instance=post)
+        self.assertTrue(form.is_valid())
+        form.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Исправленный')
+        self.assertEqual(post.comment_count, 1)
+
+    def test_latest_comments_in_two_queries(self):
+        """Последние комментарии и их авторы выбираются двумя запросами."""
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(2):
+            attach_latest_comments(posts)
+            authors = [comment.author.username for post in posts
+                       for comment in post.latest_comments]
+        self.assertEqual(len(authors), 9)
+        for post in posts:
+            with self.subTest(post=post):
+                self.assertEqual(post.latest_comments,
+                                 list(post.comments.all()[:3]))
+
+    def test_feed_shows_preview(self):
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Комментариев: 5')
+        self.assertContains(response, 'Комментарий4')
+        self.assertNotContains(response, 'Комментарий1')
+
+
+@override_settings(POSTS_COMMENTS_PER_PAGE=4)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Commenter')
+        cls.post = Post.objects.create(author=cls.user, text='Текст')
+        for i in range(10):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'Комментарий{i}')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_post_view_shows_first_comment_page(self):
+        response = self.client.get(
+            reverse('post', args=[self.user.username, self.post.id]))
+        page = response.context['comment_page']
+        self.assertEqual(list(page), list(self.post.comments.all()[:4]))
+        self.assertContains(response, 'Показать ещё')
+        self.assertNotContains(response, 'Комментарий5')
+
+    def test_fragment_walks_all_comments(self):
+        """Фрагменты по курсору отдают все комментарии ровно один раз."""
+        url = reverse('post_comments', args=[self.user.username,
+                                             self.post.id])
+        seen, after = [], None
+        while True:
+            response = self.client.get(url, {'after': after} if after else {})
+            self.assertTemplateUsed(response, 'includes/comment_list.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+            page = response.context['comment_page']
+            seen.extend(page)
+            if not page.has_next():
+                break
+            after = page.next_cursor()
+        self.assertEqual(seen, list(self.post.comments.all()))
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+
+from yatube.files import is_hashed, parse_range
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FileServingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(MEDIA_ROOT, 'posts'), exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, 'posts', 'cat.jpg'), 'wb') as f:
+            f.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def get(self, **headers):
+        response = self.client.get('/media/posts/cat.jpg', **headers)
+        body = b''.join(response.streaming_content) if (
+            response.streaming) else response.content
+        response.close()
+        return response, body
+
+    def test_whole_file_with_validators(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        etag = response['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag)[0].status_code,
+                         304)
+        since = response['Last-Modified']
+        self.assertEqual(
+            self.get(HTTP_IF_MODIFIED_SINCE=since)[0].status_code, 304)
+
+    def test_ranges(self):
+        response, body = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        response, body = self.get(HTTP_RANGE='bytes=-4')
+        self.assertEqual(body, CONTENT[-4:])
+        response, _ = self.get(HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+        # устаревший If-Range — файл целиком
+        response, body = self.get(HTTP_RANGE='bytes=0-9',
+                                  HTTP_IF_RANGE=http_date(0))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, CONTENT)
+
+    @override_settings(FILES_SENDFILE='x-accel-redirect')
+    def test_accel_redirect(self):
+        response, body = self.get(HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, b'')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/internal/media/posts/cat.jpg')
+
+    @override_settings(FILES_SENDFILE='x-sendfile')
+    def test_sendfile(self):
+        response, _ = self.get()
+        self.assertEqual(response['X-Sendfile'],
+                         os.path.join(MEDIA_ROOT, 'posts', 'cat.jpg'))
+
+    def test_missing_and_outside_files(self):
+        for path in ('/media/posts/dog.jpg', '/media/posts/',
+                     '/media/../settings.py'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+
+class FileHelpersTests(TestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=2-100', 10), (2, 9))
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(parse_range('items=0-1', 10))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=10-', 10)
+
+    def test_hashed_names_are_immutable(self):
+        digest = 'ab' * 32
+        self.assertTrue(is_hashed(f'posts/ab/{digest}.jpg'))
+        self.assertTrue(is_hashed(f'variants/posts/ab/{digest}/640.webp'))
+        self.assertTrue(is_hashed('css/style.0123456789ab.css'))
+        self.assertFalse(is_hashed('posts/cat.jpg'))
+        self.assertFalse(is_hashed('css/style.css'))
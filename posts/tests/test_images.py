@@ -0,0 +1,128 @@
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images
+from posts.models import Post
+from posts.tests.utils import TempMediaMixin, image_file, run_on_commit
+
+User = get_user_model()
+
+
+@override_settings(POSTS_IMAGE_WORKERS=0)
+class ImageVariantTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Painter')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_variants_are_ready_after_upload(self):
+        """После публикации есть все варианты, а карточка выводит srcset."""
+        # с прозрачностью: JPEG-варианты её не поддерживают
+        image = image_file('cat.png', mode='RGBA')
+        with run_on_commit():
+            self.client.post(reverse('new_post'),
+                             {'text': 'Кот', 'image': image})
+        post = Post.objects.get()
+        self.assertEqual(post.variant_widths, [320, 640])
+        for width in (320, 640):
+            for image_format in ('webp', 'jpeg'):
+                name = images.variant_name(post.image.name, width,
+                                           image_format)
+                with default_storage.open(name) as file:
+                    self.assertEqual(Image.open(file).width, width)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, '/640.webp 640w')
+
+    def test_missing_file_is_skipped(self):
+        with run_on_commit():
+            post = Post.objects.create(author=self.user, text='Текст',
+                                       image='posts/missing.jpg')
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, '')
+
+    def test_variants_are_reset_when_image_changes(self):
+        """Смена или удаление картинки сбрасывает прежние варианты."""
+        post = Post.objects.create(author=self.user, text='Текст',
+                                   image='posts/old.jpg')
+        for image in ('posts/new.jpg', None):
+            with self.subTest(image=image):
+                Post.objects.filter(pk=post.pk).update(
+                    image_variants='320,640')
+                post.refresh_from_db()
+                post.image = image
+                post.save()
+                post.refresh_from_db()
+                self.assertEqual(post.image_variants, '')
+
+    def test_variants_survive_text_edit(self):
+        post = Post.objects.create(author=self.user, text='Текст',
+                                   image='posts/old.jpg')
+        Post.objects.filter(pk=post.pk).update(image_variants='320,640')
+        post.refresh_from_db()
+        post.text = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.variant_widths, [320, 640])
+
+    def test_stale_edit_keeps_image_fields(self):
+        """Редактирование не затирает варианты, готовые после чтения."""
+        post = Post.objects.create(author=self.user, text='Текст',
+                                   image='posts/old.jpg')
+        stale = Post.objects.get(pk=post.pk)
+        images.mark_ready(post.pk, 'posts/old.jpg', [320, 640])
+        Post.objects.filter(pk=post.pk).update(image_width=800,
+                                               image_height=400)
+        stale.text = 'Новый текст'
+        stale.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertEqual(post.variant_widths, [320, 640])
+        self.assertEqual((post.image_width, post.image_height), (800, 400))
+
+    @override_settings(POSTS_IMAGE_WORKERS=1)
+    def test_variants_are_generated_in_process_pool(self):
+        name = default_storage.save('posts/pool.png', image_file('cat.png'))
+        widths = images.executor().submit(
+            images.generate_variants, name).result(timeout=30)
+        self.assertEqual(widths, [320, 640])
+        self.assertTrue(default_storage.exists(
+            images.variant_name(name, 320, 'webp')))
+
+    def test_placeholder_and_size_are_stored_on_upload(self):
+        """До загрузки картинки карточка знает её размеры и заглушку."""
+        self.client.post(reverse('new_post'),
+                         {'text': 'Кот', 'image': image_file('cat.png')})
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (800, 400))
+        self.assertTrue(post.image_placeholder.startswith(
+            'data:image/webp;base64,'))
+        self.assertLess(len(post.image_placeholder), 500)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'width="800"')
+        self.assertContains(response, 'height="400"')
+        self.assertContains(response, post.image_placeholder)
+
+    def test_only_first_card_image_is_eager(self):
+        """Первая картинка ленты видна сразу и грузится без задержки."""
+        for text in ('Кот', 'Пёс'):
+            self.client.post(reverse('new_post'),
+                             {'text': text, 'image': image_file('cat.png')})
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'loading="lazy"', count=1)
+        self.assertContains(response, '<img', count=2)
+        post = Post.objects.get(text='Пёс')
+        response = self.client.get(
+            reverse('post', args=[self.user.username, post.id]))
+        self.assertNotContains(response, 'loading="lazy"')
+
+    def test_missing_file_has_no_placeholder(self):
+        post = Post.objects.create(author=self.user, text='Текст',
+                                   image='/nonexistent/cat.png')
+        post.refresh_from_db()
+        self.assertIsNone(post.image_width)
+        self.assertEqual(post.image_placeholder, '')
+        self.assertEqual(self.client.get(reverse('index')).status_code, 200)
@@ -0,0 +1,184 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import views
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=60)
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='Группа', slug='cached')
+        cls.post = Post.objects.create(author=cls.author, text='Текст',
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def urls(self):
+        return [
+            reverse('index'),
+            reverse('group_posts', args=[self.group.slug]),
+            reverse('profile', args=[self.author.username]),
+            reverse('post', args=[self.author.username, self.post.id]),
+        ]
+
+    def assertPageCache(self, url, state):
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Page-Cache'], state)
+        return response
+
+    def test_second_request_is_served_from_cache(self):
+        """Повторный анонимный запрос отдаётся из кэша страниц."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.assertPageCache(url, 'MISS')
+                response = self.assertPageCache(url, 'HIT')
+                self.assertIn(f'post:{self.post.id}',
+                              response['Surrogate-Key'])
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_purge_tagged_pages(self):
+        """Изменение записи, комментарий и группа сбрасывают страницы."""
+        changes = [
+            lambda: Post.objects.create(author=self.author, text='Новый',
+                                        group=self.group),
+            lambda: Comment.objects.create(post=self.post,
+                                           author=self.author,
+                                           text='Комментарий'),
+            lambda: Group.objects.filter(pk=self.group.pk).first().save(),
+        ]
+        for change in changes:
+            for url in self.urls():
+                self.guest_client.get(url)
+            change()
+            for url in self.urls():
+                with self.subTest(url=url, change=change):
+                    self.assertPageCache(url, 'MISS')
+
+    def test_change_during_rendering_is_not_cached(self):
+        """Страница, во время рендеринга которой сменилась лента, не
+        сохраняется с новыми поколениями."""
+        def tag_response(response, keys):
+            Post.objects.create(author=self.author, text='Новый')
+            return real_tag_response(response, keys)
+
+        real_tag_response = views.tag_response
+        url = reverse('index')
+        with mock.patch.object(views, 'tag_response', tag_response):
+            self.assertPageCache(url, 'MISS')
+        response = self.assertPageCache(url, 'MISS')
+        self.assertContains(response, 'Новый')
+        self.assertPageCache(url, 'HIT')
+
+    def test_stale_fragment_is_not_cached_or_validated(self):
+        """Страница с устаревшим фрагментом не сохраняется и идёт без
+        ETag."""
+        def add(key, *args, **kwargs):
+            # фрагменты в это время пересчитывает другой запрос
+            return (not key.endswith(':lock')
+                    and real_add(key, *args, **kwargs))
+
+        real_add = cache.add
+        url = reverse('index')
+        self.assertPageCache(url, 'MISS')
+        Post.objects.create(author=self.author, text='Новый')
+        with mock.patch.object(cache, 'add', add):
+            response = self.guest_client.get(url)
+        self.assertNotContains(response, 'Новый')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        response = self.assertPageCache(url, 'MISS')
+        self.assertContains(response, 'Новый')
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_logged_in_pages_are_not_cached(self):
+        client = Client()
+        client.force_login(self.author)
+        for url in self.urls():
+            with self.subTest(url=url):
+                client.get(url)
+                self.assertFalse(client.get(url).has_header('X-Page-Cache'))
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(title='Группа', slug='etag')
+        cls.post = Post.objects.create(author=cls.author, text='Текст',
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def urls(self):
+        return [
+            reverse('index'),
+            reverse('group_posts', args=[self.group.slug]),
+            reverse('profile', args=[self.author.username]),
+            reverse('post', args=[self.author.username, self.post.id]),
+        ]
+
+    def test_unchanged_pages_answer_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304 без тела."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(url,
+                                                 HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_changes_and_viewer_change_validator(self):
+        """ETag меняется после комментария и зависит от читателя."""
+        etags = {url: self.guest_client.get(url)['ETag']
+                 for url in self.urls()}
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        client = Client()
+        client.force_login(self.reader)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url,
+                                                 HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                self.assertNotEqual(client.get(url)['ETag'], etag)
+
+    def test_group_rename_updates_every_feed(self):
+        """Новое название группы видно и в общих лентах, а не только
+        на странице группы."""
+        client = Client()
+        client.force_login(self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        urls = self.urls() + [reverse('follow_index')]
+        for url in urls:
+            client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), 'Новое название')
+
+    def test_missing_objects_still_404(self):
+        response = self.guest_client.get(
+            reverse('group_posts', args=['missing']))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.paginator import Page, Paginator
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.anchors import GLOBAL_FEED, get_numbered_page, group_feed
+from posts.models import FeedAnchor, Group, Post
+from posts.paginator import CursorPaginator
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='CursorUser')
+        cls.group = Group.objects.create(title='Группа', slug='cursor')
+        for i in range(25):
+            Post.objects.create(author=cls.user, text=f'Текст{i}',
+                                group=cls.group)
+        cls.guest_client = Client()
+
+    def test_pages_cover_feed_without_gaps(self):
+        """Страницы по курсору проходят ленту целиком и по порядку."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.get_page(after=page.next_cursor())
+            seen.extend(page)
+        self.assertEqual(seen, list(Post.objects.all()))
+        self.assertEqual(len(page), 5)
+
+    def test_before_returns_previous_page(self):
+        """Курсор ``before`` возвращает предыдущую страницу."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.get_page()
+        second = paginator.get_page(after=first.next_cursor())
+        back = paginator.get_page(before=second.previous_cursor())
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page(after='not-a-cursor')
+        self.assertEqual(page[0], Post.objects.first())
+        self.assertFalse(page.has_previous())
+
+    def test_feed_views_accept_cursor(self):
+        """Ленты переключаются в курсорный режим по параметру ``after``."""
+        cursor = CursorPaginator(Post.objects.all(), 10).get_page()
+        urls = [
+            reverse('index'),
+            reverse('group_posts', args=[self.group.slug]),
+            reverse('profile', args=[self.user.username]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, {'after': cursor.next_cursor()})
+                page = response.context['page']
+                self.assertEqual(len(page), 10)
+                self.assertEqual(page[0], Post.objects.all()[10])
+                self.assertContains(response, '?before=')
+
+
+@override_settings(POSTS_ANCHOR_EVERY=1)
+class AnchoredPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AnchorUser')
+        cls.group = Group.objects.create(title='Группа', slug='anchor')
+        for i in range(47):
+            Post.objects.create(author=cls.user, text=f'Текст{i}',
+                                group=cls.group if i % 2 else None)
+
+    def assertPagesMatch(self, key, queryset):
+        expected = Paginator(queryset, 10)
+        for number in expected.page_range:
+            with self.subTest(key=key, number=number):
+                page, paginator = get_numbered_page(key, queryset, number,
+                                                    10)
+                self.assertEqual(type(page), Page)
+                self.assertEqual(type(paginator), Paginator)
+                self.assertEqual(paginator.num_pages, expected.num_pages)
+                self.assertEqual(list(page),
+                                 list(expected.page(number).object_list))
+
+    def test_numbered_pages_match_offset_pages(self):
+        """Страницы по якорям совпадают со страницами OFFSET."""
+        self.assertPagesMatch(GLOBAL_FEED, Post.objects.all())
+        self.assertPagesMatch(group_feed(self.group.id),
+                              self.group.posts.all())
+        self.assertTrue(FeedAnchor.objects.exists())
+
+    def test_anchors_follow_post_changes(self):
+        """Якоря поправляются при создании, удалении и смене группы."""
+        self.assertPagesMatch(GLOBAL_FEED, Post.objects.all())
+        self.assertPagesMatch(group_feed(self.group.id),
+                              self.group.posts.all())
+        Post.objects.all()[30].delete()
+        Post.objects.create(author=self.user, text='Новый', group=self.group)
+        moved = Post.objects.filter(group=None)[15]
+        moved.group = self.group
+        moved.save()
+        self.assertPagesMatch(GLOBAL_FEED, Post.objects.all())
+        self.assertPagesMatch(group_feed(self.group.id),
+                              self.group.posts.all())
+
+    def test_deep_page_in_view(self):
+        response = self.client.get(reverse('index'), {'page': 5})
+        self.assertEqual(list(response.context['page']),
+                         list(Post.objects.all()[40:]))
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Наибольшее число SQL-запросов на страницу из 10 записей, включая
+# сессию, пользователя и поиск id для ETag. Оно не должно зависеть
+# от числа комментариев.
+QUERY_BUDGETS = {
+    'index': 6,
+    'group_posts': 8,
+    'profile': 9,
+    'follow_index': 9,
+    'post': 6,
+}
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(title='Группа', slug='budget')
+        cls.authors = [User.objects.create_user(username=f'Author{i}')
+                       for i in range(3)]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        for i in range(12):
+            Post.objects.create(author=cls.authors[i % 3], text=f'Текст{i}',
+                                group=cls.group)
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def urls(self):
+        author = self.post.author.username
+        return {
+            'index': reverse('index'),
+            'group_posts': reverse('group_posts', args=[self.group.slug]),
+            'profile': reverse('profile', args=[author]),
+            'follow_index': reverse('follow_index'),
+            'post': reverse('post', args=[author, self.post.id]),
+        }
+
+    def add_comments(self, per_post):
+        commenters = [User.objects.create_user(username=f'Commenter{i}')
+                      for i in range(per_post)]
+        for post in Post.objects.all():
+            for commenter in commenters:
+                Comment.objects.create(post=post, author=commenter,
+                                       text='Комментарий')
+
+    def assertMaxQueries(self, name, url):
+        # первый запрос страницы заводит строки счётчиков лент
+        self.client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), QUERY_BUDGETS[name],
+            '\n'.join(query['sql'] for query in queries.captured_queries))
+
+    def test_pages_fit_budget(self):
+        for name, url in self.urls().items():
+            with self.subTest(name=name):
+                self.assertMaxQueries(name, url)
+
+    def test_budget_does_not_grow_with_comments(self):
+        """Десятки комментариев с разными авторами не добавляют запросов."""
+        self.add_comments(15)
+        for name, url in self.urls().items():
+            with self.subTest(name=name):
+                self.assertMaxQueries(name, url)
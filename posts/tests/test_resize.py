@@ -0,0 +1,93 @@
+import os
+import shutil
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import resize
+from posts.models import Post
+from posts.tests.utils import TempMediaMixin, image_file
+
+User = get_user_model()
+
+
+@override_settings(POSTS_RESIZE_WIDTHS=(160, 320))
+class ResizedImageTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username='Painter')
+        cls.posts = [Post.objects.create(author=user, text=f'Текст{i}',
+                                         image=image_file(f'pic{i}.jpg',
+                                                          color=color))
+                     for i, color in enumerate(['green', 'red', 'blue'])]
+
+    def setUp(self):
+        shutil.rmtree(resize.cache_root(), ignore_errors=True)
+        resize._estimated_bytes = None
+
+    def url(self, width, post=None):
+        post = post or self.posts[0]
+        return reverse('resized_image', args=[width, post.image.name])
+
+    def test_resized_once_and_cached(self):
+        """Копия создаётся при первом запросе и отдаётся надолго."""
+        response = self.client.get(self.url(160))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        image = Image.open(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(image.size, (160, 80))
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url(160))
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_rejects_unknown_sizes_and_paths(self):
+        urls = [
+            self.url(170),
+            reverse('resized_image', args=[160, 'posts/missing.jpg']),
+            reverse('resized_image', args=[160, '../../etc/passwd']),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_copy_evicted_while_serving_is_still_sent(self):
+        """Копию, вытесненную соседним запросом, ответ всё равно отдаёт."""
+        path = resize.cached_path(160, self.posts[0].image.name)
+        with self.settings(POSTS_RESIZE_CACHE_BYTES=0):
+            response = self.client.get(self.url(160))
+        self.assertFalse(os.path.exists(path))
+        image = Image.open(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(image.size, (160, 80))
+        self.client.get(self.url(160)).close()
+        with mock.patch.object(resize, 'touch', os.unlink):
+            response = self.client.get(self.url(160))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        image = Image.open(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(image.size, (160, 80))
+
+    def test_decompression_bomb_is_not_found(self):
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            response = self.client.get(self.url(160))
+        self.assertEqual(response.status_code, 404)
+
+    def test_least_recently_used_copies_are_evicted(self):
+        for post in self.posts[:2]:
+            self.client.get(self.url(320, post)).close()
+        first = resize.cached_path(320, self.posts[0].image.name)
+        second = resize.cached_path(320, self.posts[1].image.name)
+        os.utime(second, (1, 1))
+        size = os.path.getsize(first)
+        with self.settings(POSTS_RESIZE_CACHE_BYTES=size * 2.5):
+            self.client.get(self.url(320)).close()
+            self.client.get(self.url(320, self.posts[2])).close()
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.paginator import CursorPaginator
+from posts.search import SearchPaginator
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Searcher')
+        cls.best = Post.objects.create(
+            author=cls.user, text='Ёжик в тумане, снова ёжик и ёжики')
+        cls.other = Post.objects.create(
+            author=cls.user, text='Лошадь в тумане <b>ищет</b> ёжика')
+        cls.missing = Post.objects.create(author=cls.user, text='Про котов')
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('search'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_results_are_ranked_and_highlighted(self):
+        """Записи с большим числом совпадений идут первыми."""
+        response = self.search('ёжик')
+        self.assertEqual(list(response.context['page']),
+                         [self.best, self.other])
+        self.assertContains(response, '<mark>Ёжик</mark>')
+        self.assertContains(response, '&lt;b&gt;ищет&lt;/b&gt;')
+
+    def test_index_follows_changes(self):
+        """Триггеры поддерживают индекс и при update() в обход моделей."""
+        Post.objects.filter(pk=self.missing.pk).update(text='Ёжик и коты')
+        Post.objects.filter(pk=self.other.pk).delete()
+        self.assertEqual(list(self.search('ёжик').context['page']),
+                         [self.best, self.missing])
+
+    def test_post_deleted_after_index_lookup_is_skipped(self):
+        def rows(*args, **kwargs):
+            found = real_rows(*args, **kwargs)
+            Post.objects.filter(pk=self.other.pk).delete()
+            return found
+
+        real_rows = SearchPaginator._rows
+        with mock.patch.object(SearchPaginator, '_rows', rows):
+            page = self.search('ёжик').context['page']
+        self.assertEqual(list(page), [self.best])
+
+    def test_cursor_pages_cover_results(self):
+        for i in range(25):
+            Post.objects.create(author=self.user, text=f'Туман номер {i}')
+        paginator = SearchPaginator('туман', 10)
+        page = paginator.get_page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.get_page(after=page.next_cursor())
+            seen.extend(page)
+        self.assertEqual(len(seen), 27)
+        self.assertEqual(len(set(seen)), 27)
+        back = paginator.get_page(before=page.previous_cursor())
+        self.assertEqual(len(back), 10)
+        response = self.search('туман')
+        self.assertContains(response, '?q=%D1%82%D1%83%D0%BC%D0%B0%D0%BD'
+                                      '&amp;after=')
+
+    def test_date_cursor_returns_first_page(self):
+        paginator = SearchPaginator('ёжик', 10)
+        cursor = CursorPaginator(Post.objects.all(), 10).encode_cursor(
+            self.best)
+        self.assertEqual(list(paginator.get_page(after=cursor)),
+                         list(paginator.get_page()))
+
+    def test_query_syntax_is_not_passed_to_fts(self):
+        for query in ['"', 'OR (', '***', '']:
+            with self.subTest(query=query):
+                self.assertEqual(list(self.search(query).context['page']), [])
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='Admin', email='admin@example.com', password='pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(reverse('admin:posts_post_changelist'),
+                              {'q': 'ёжик'})
+        self.assertEqual(set(response.context['cl'].result_list),
+                         {self.best, self.other})
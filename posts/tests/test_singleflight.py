@@ -0,0 +1,70 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from posts.singleflight import get_or_compute, lock_key
+
+
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'value{self.calls}'
+
+    def test_fresh_value_is_computed_once(self):
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value1')
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value1')
+        self.assertEqual(self.calls, 1)
+
+    def test_new_version_is_recomputed(self):
+        get_or_compute('key', self.compute, 60, version=1)
+        self.assertEqual(get_or_compute('key', self.compute, 60, version=2),
+                         'value2')
+
+    def test_stale_value_served_while_other_request_recomputes(self):
+        """Пока пересчитывает другой запрос, отдаётся прежнее значение."""
+        get_or_compute('key', self.compute, 60, version=1)
+        cache.add(lock_key('key'), True)
+        on_stale = mock.Mock()
+        self.assertEqual(get_or_compute('key', self.compute, 60, version=2,
+                                        on_stale=on_stale),
+                         'value1')
+        self.assertEqual(self.calls, 1)
+        on_stale.assert_called_once_with()
+
+    @override_settings(POSTS_CACHE_LOCK_TIMEOUT=0.1)
+    def test_waits_for_lock_then_computes(self):
+        cache.add(lock_key('key'), True, 0.1)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value1')
+
+    def test_slow_values_refresh_early(self):
+        """Долго считающееся значение обновляется до истечения срока."""
+        cache.set('key', (None, 'old', 1000.0, time.time() + 10))
+        with mock.patch('posts.singleflight.random.random',
+                        return_value=1 - 1e-9):
+            self.assertEqual(get_or_compute('key', self.compute, 60),
+                             'value1')
+        with mock.patch('posts.singleflight.random.random',
+                        return_value=0.0):
+            self.assertEqual(get_or_compute('key', self.compute, 60),
+                             'value1')
+
+    def test_fragment_cache_tag(self):
+        template = Template(
+            '{% load fragment_cache %}'
+            '{% fragment_cache 60 name key version=version %}'
+            '{{ text }}{% endfragment_cache %}')
+
+        def render(text, version):
+            return template.render(Context(
+                {'key': 'k', 'text': text, 'version': version}))
+
+        self.assertEqual(render('первый', 1), 'первый')
+        self.assertEqual(render('второй', 1), 'первый')
+        self.assertEqual(render('второй', 2), 'второй')
@@ -0,0 +1,58 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, override_settings
+
+from yatube.sqlite3.base import DatabaseWrapper
+
+
+@override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL',
+                                   'busy_timeout': 50,
+                                   'synchronous': 'NORMAL'})
+class SQLiteProfileTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+        self.wrappers = []
+
+    def tearDown(self):
+        for wrapper in self.wrappers:
+            wrapper.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def connect(self):
+        wrapper = DatabaseWrapper({**connection.settings_dict,
+                                   'NAME': self.path,
+                                   'CONN_HEALTH_CHECKS': True})
+        wrapper.ensure_connection()
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        return wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_pragmas_are_applied(self):
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 50)
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+
+    def test_transactions_take_write_lock_at_begin(self):
+        """Второй писатель ждёт у BEGIN, а не падает посреди транзакции."""
+        first, second = self.connect(), self.connect()
+        first._start_transaction_under_autocommit()
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            second._start_transaction_under_autocommit()
+        first.connection.execute('ROLLBACK')
+
+    def test_replaced_database_file_closes_connection(self):
+        wrapper = self.connect()
+        self.assertTrue(wrapper.is_usable())
+        sqlite3.connect(self.path + '.new').close()
+        os.replace(self.path + '.new', self.path)
+        self.assertFalse(wrapper.is_usable())
+        wrapper.close_if_unusable_or_obsolete()
+        self.assertIsNone(wrapper.connection)
@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import stats
+from posts.models import Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_posts_and_follows(self):
+        """Счётчики меняются при создании и удалении записей и подписок."""
+        post = Post.objects.create(author=self.author, text='Текст')
+        Post.objects.create(author=self.author, text='Текст')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        post.delete()
+        follow.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_rebuild_command_fixes_drift(self):
+        Post.objects.create(author=self.author, text='Текст')
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        call_command('rebuild_user_stats', verbosity=0)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+
+    def test_profile_shows_stats(self):
+        Post.objects.create(author=self.author, text='Текст')
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(
+            reverse('profile', args=[self.author.username]))
+        self.assertEqual(response.context['stats'],
+                         self.stats(self.author))
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Записей: 1')
+
+    def test_row_created_concurrently_is_updated(self):
+        """Строку завели между UPDATE и созданием — без IntegrityError."""
+        UserStats.objects.filter(user=self.author).delete()
+        real_shift = stats._shift
+        calls = []
+
+        def shift(user_id, deltas):
+            calls.append(deltas)
+            if len(calls) == 1:
+                UserStats.objects.create(user=self.author, posts_count=5)
+                return 0
+            return real_shift(user_id, deltas)
+
+        with mock.patch.object(stats, '_shift', shift):
+            stats.change(self.author.pk, posts_count=1)
+        self.assertEqual(self.stats(self.author).posts_count, 6)
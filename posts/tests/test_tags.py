@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Mention, Post, PostTag
+from posts.paginator import CursorPaginator
+from posts.tags import parse_mentions, parse_tags
+
+User = get_user_model()
+
+
+class ParseTests(TestCase):
+    def test_parse_tags(self):
+        self.assertEqual(parse_tags('#Django и #django, #Кот! a#b &#39;'),
+                         ['django', 'кот'])
+
+    def test_parse_mentions(self):
+        self.assertEqual(parse_mentions('Привет, @leo. Пишите a@b.ru @leo'),
+                         ['leo'])
+
+
+class TagFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.leo = User.objects.create_user(username='leo')
+        cls.client_author = Client()
+        cls.client_author.force_login(cls.author)
+
+    def test_new_and_edited_posts_are_indexed(self):
+        """Теги и упоминания разбираются при создании и редактировании."""
+        self.client_author.post(reverse('new_post'),
+                                {'text': 'Первый #Кот для @leo'})
+        post = Post.objects.get()
+        self.assertEqual(
+            list(post.tag_entries.values_list('tag__name', flat=True)),
+            ['кот'])
+        self.assertEqual(list(self.leo.mentions.values_list('post',
+                                                            flat=True)),
+                         [post.id])
+        self.client_author.post(
+            reverse('post_edit', args=[self.author.username, post.id]),
+            {'text': 'Теперь #пёс'})
+        self.assertEqual(
+            list(post.tag_entries.values_list('tag__name', flat=True)),
+            ['пёс'])
+        self.assertFalse(Mention.objects.exists())
+
+    def test_tag_feed_pages_by_cursor(self):
+        for i in range(15):
+            Post.objects.create(author=self.author, text=f'Запись {i} #Тег')
+        Post.objects.create(author=self.author, text='Без тегов')
+        url = reverse('tag_posts', args=['тег'])
+        response = self.client.get(url)
+        entries = list(response.context['page'])
+        self.assertEqual([entry.post for entry in entries],
+                         list(Post.objects.filter(text__contains='#')[:10]))
+        cursor = CursorPaginator(PostTag.objects.all(), 10).encode_cursor(
+            entries[-1])
+        response = self.client.get(url, {'after': cursor})
+        self.assertEqual(len(response.context['page']), 5)
+        self.assertContains(response, f'href="{url}"')
+
+    def test_mention_feed(self):
+        post = Post.objects.create(author=self.author, text='Для @leo')
+        response = self.client.get(reverse('mention_posts', args=['leo']))
+        self.assertEqual([entry.post for entry in response.context['page']],
+                         [post])
+        self.assertContains(
+            response, f'<a href="{reverse("profile", args=["leo"])}">@leo</a>')
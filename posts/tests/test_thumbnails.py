@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from posts import thumbnails
+from posts.models import Post
+from posts.tests.utils import TempMediaMixin, image_file
+
+User = get_user_model()
+
+
+class ThumbnailPrefetchTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Painter')
+        cls.posts = [Post.objects.create(author=cls.user, text=f'Текст{i}',
+                                         image=image_file(f'pic{i}.png',
+                                                          (60, 30), color))
+                     for i, color in enumerate(['blue', 'red', 'green'])]
+        Post.objects.create(author=cls.user, text='Без картинки')
+
+    def setUp(self):
+        cache.clear()
+        thumbnails._lru.clear()
+
+    def test_key_matches_sorl(self):
+        post = self.posts[0]
+        expected = get_thumbnail(post.image, '1100', upscale=True)
+        found = thumbnails.get_thumbnails([post.image])
+        self.assertEqual(found[post.image.name].url, expected.url)
+
+    def test_page_is_resolved_in_one_query(self):
+        """Миниатюры всей страницы — один запрос, затем из памяти."""
+        sorl = [get_thumbnail(post.image, '1100', upscale=True)
+                for post in self.posts]
+        cache.clear()
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            thumbnails.attach_thumbnails(posts)
+        self.assertEqual(
+            [post.thumbnail.url for post in posts if post.image],
+            [thumbnail.url for thumbnail in reversed(sorl)])
+        self.assertIsNone(posts[0].thumbnail)
+        cache.clear()
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(0):
+            thumbnails.attach_thumbnails(posts)
+
+    def test_feed_uses_prefetched_thumbnails(self):
+        url = get_thumbnail(self.posts[0].image, '1100', upscale=True).url
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['page'][-1].thumbnail.url, url)
+        self.assertContains(response, f'src="{url}"')
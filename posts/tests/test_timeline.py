@@ -0,0 +1,146 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry
+from posts.timeline import is_popular, pull_feed
+
+User = get_user_model()
+
+
+class FanOutTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        return list(self.client.get(reverse('follow_index')).context['page'])
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        """Подписка добавляет старые записи, новые раскладываются сразу."""
+        self.client.get(reverse('profile_follow',
+                                args=[self.author.username]))
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_unfollow_prunes_timeline(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(reverse('profile_unfollow',
+                                args=[self.author.username]))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(POSTS_FANOUT_LIMIT=0)
+    def test_popular_author_merged_on_read(self):
+        """Записи популярного автора не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    @override_settings(POSTS_FANOUT_LIMIT=2, POSTS_FANOUT_RESUME_LIMIT=1)
+    def test_author_no_longer_popular_is_backfilled(self):
+        """Записи времён популярности не пропадают после отписок."""
+        others = [User.objects.create_user(username=f'Other{i}')
+                  for i in range(2)]
+        Follow.objects.create(user=self.reader, author=self.author)
+        for other in others:
+            Follow.objects.create(user=other, author=self.author)
+        popular_post = Post.objects.create(author=self.author,
+                                           text='Популярный')
+        self.assertFalse(TimelineEntry.objects.filter(
+            post=popular_post).exists())
+        # между порогами автор остаётся популярным
+        Follow.objects.filter(user=others[0]).delete()
+        self.assertTrue(is_popular(self.author.pk))
+        Follow.objects.filter(user=others[1]).delete()
+        self.assertFalse(is_popular(self.author.pk))
+        # отписка ничего не раскладывает: лента дополняется при чтении
+        self.assertFalse(TimelineEntry.objects.filter(
+            post=popular_post).exists())
+        self.assertEqual(self.feed(), [popular_post, self.old_post])
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=popular_post).exists())
+        self.assertTrue(Follow.objects.get(user=self.reader).backfilled)
+
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_feed_pages_over_timeline_and_popular_authors(self):
+        star = User.objects.create_user(username='Star')
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(author=self.author, text=f'Текст{i}')
+                 for i in range(2)]
+        with self.settings(POSTS_FANOUT_LIMIT=0):
+            Follow.objects.create(user=self.reader, author=star)
+            posts += [Post.objects.create(author=star, text=f'Звезда{i}')
+                      for i in range(2)]
+        expected = sorted(posts + [self.old_post],
+                          key=lambda post: (post.pub_date, post.pk),
+                          reverse=True)
+        with self.settings(POSTS_FANOUT_LIMIT=0):
+            response = self.client.get(reverse('follow_index'), {'page': 3})
+            self.assertEqual(response.context['paginator'].count, 5)
+            self.assertEqual(list(response.context['page']), expected[4:])
+            with self.settings(POSTS_CURSOR_PAGINATION=True):
+                page = self.client.get(
+                    reverse('follow_index')).context['page']
+                pages = [list(page)]
+                while page.has_next():
+                    page = self.client.get(reverse('follow_index'), {
+                        'after': page.next_cursor()}).context['page']
+                    pages.append(list(page))
+        self.assertEqual(sum(pages, []), expected)
+
+
+@override_settings(POSTS_FOLLOW_FEED='pull')
+class PullTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authors = [User.objects.create_user(username=f'Author{i}')
+                       for i in range(3)]
+        for i in range(12):
+            Post.objects.create(author=cls.authors[i % 3], text=f'Текст{i}')
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def expected(self):
+        return list(Post.objects.filter(
+            author__following__user=self.reader))
+
+    def test_merged_feed_matches_join(self):
+        """Слияние списков авторов даёт ту же ленту, что и соединение."""
+        response = self.client.get(reverse('follow_index'))
+        self.assertEqual(list(response.context['page']), self.expected())
+
+    def test_warm_feed_costs_one_query(self):
+        list(pull_feed(self.reader)[0:10])
+        with self.assertNumQueries(1):
+            page = pull_feed(self.reader)[0:10]
+        self.assertEqual(page, self.expected()[:10])
+
+    def test_cached_lists_follow_changes(self):
+        list(pull_feed(self.reader)[0:10])
+        Post.objects.create(author=self.authors[0], text='Новый')
+        Post.objects.filter(author=self.authors[1]).first().delete()
+        self.client.get(reverse('profile_follow',
+                                args=[self.authors[2].username]))
+        response = self.client.get(reverse('follow_index'))
+        self.assertEqual(list(response.context['page']),
+                         self.expected()[:10])
@@ -0,0 +1,64 @@
+from django import forms
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.models import Post
+from posts.tests.utils import TempMediaMixin, image_file
+from posts.uploads import process_image
+
+User = get_user_model()
+
+
+@override_settings(POSTS_UPLOAD_MAX_SIDE=1000)
+class UploadPipelineTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Photographer')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_large_photo_is_downscaled_without_metadata(self):
+        """Оригинал уменьшается и пересохраняется без EXIF."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Phone'
+        self.client.post(reverse('new_post'), {
+            'text': 'Фото',
+            'image': image_file('photo.jpg', (3000, 1500), 'orange',
+                                exif=exif.tobytes())})
+        post = Post.objects.get()
+        with post.image.open() as file, Image.open(file) as image:
+            self.assertEqual(image.size, (1000, 500))
+            self.assertEqual(image.format, 'JPEG')
+            self.assertNotIn('exif', image.info)
+
+    def test_multi_picture_photo_is_reencoded(self):
+        """Снимок с Multi-Picture данными (MPO) уменьшается как JPEG."""
+        exif = Image.Exif()
+        exif[0x8825] = {1: 'N'}
+        upload = image_file('phone.jpg', (4000, 3000), 'orange',
+                            image_format='MPO', save_all=True,
+                            exif=exif.tobytes(),
+                            append_images=[Image.new('RGB', (4000, 3000))])
+        with Image.open(upload) as image:
+            self.assertEqual(image.format, 'MPO')
+        result = process_image(upload)
+        self.assertEqual(result.name, 'phone.jpg')
+        with Image.open(result) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (1000, 750))
+            self.assertNotIn('exif', image.info)
+
+    @override_settings(POSTS_UPLOAD_MAX_PIXELS=100 * 100)
+    def test_decompression_bomb_is_rejected(self):
+        form = PostForm({'text': 'Бомба'},
+                        {'image': image_file('bomb.png', (200, 200))})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'image_too_large')
+
+    def test_form_fields_unchanged(self):
+        form = PostForm()
+        self.assertEqual(list(form.fields), ['group', 'text', 'image'])
+        self.assertEqual(type(form.fields['image']), forms.ImageField)
@@ -166,18 +166,67 @@ class PostPagesTests(TestCase):
                 self.assertIsInstance(form_field, expected)
 
     def test_posts_on_index_page_cache(self):
+        """Фрагмент ленты кэшируется, но новая запись видна сразу."""
         response_1 = self.guest_client.get(reverse('index'))
         first_post_1 = response_1.context.get('page')[0]
         self.assertContains(response_1, first_post_1.text)
 
-        Post.objects.create(author=self.user, text='Новый тестовый текст')
+        new_post = Post.objects.create(author=self.user,
+                                       text='Новый тестовый текст')
         response_2 = self.guest_client.get(reverse('index'))
-        first_post_2 = response_2.context.get('page')[0]
-        self.assertNotContains(response_2, first_post_2.text)
+        self.assertContains(response_2, new_post.text)
 
-        cache.clear()
+        # изменение в обход сигналов не сбрасывает фрагмент
+        Post.objects.filter(pk=new_post.pk).update(text='Обновлённый текст')
         response_3 = self.guest_client.get(reverse('index'))
-        self.assertContains(response_3, first_post_2.text)
+        self.assertNotContains(response_3, 'Обновлённый текст')
+
+        cache.clear()
+        response_4 = self.guest_client.get(reverse('index'))
+        self.assertContains(response_4, 'Обновлённый текст')
+
+    def test_follow_feed_fragment_is_private(self):
+        """Фрагмент ленты подписок не попадает к другим пользователям."""
+        cache.clear()
+        reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=reader, author=self.user)
+        reader_client = Client()
+        reader_client.force_login(reader)
+        self.assertContains(reader_client.get(reverse('follow_index')),
+                            self.post.text)
+        response = self.authorized_client.get(reverse('follow_index'))
+        self.assertNotContains(response, self.post.text)
+
+
+class PostFragmentCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(author=cls.author, text='Старый текст')
+        cls.url = reverse('post', args=[cls.author.username, cls.post.id])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_fragment_follows_updated(self):
+        """Карточка записи кэшируется до изменения поля updated."""
+        self.assertContains(self.client.get(self.url), 'Старый текст')
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        self.assertContains(self.client.get(self.url), 'Старый текст')
+        post = Post.objects.get(pk=self.post.pk)
+        post.save()
+        self.assertContains(self.client.get(self.url), 'Новый текст')
+
+    def test_edit_button_not_cached(self):
+        """Кнопка редактирования не попадает в общий фрагмент."""
+        author_client = Client()
+        author_client.force_login(self.author)
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        self.assertContains(author_client.get(self.url), 'Редактировать')
+        self.assertNotContains(reader_client.get(self.url), 'Редактировать')
 
 
 class PaginatorViewsTest(TestCase):
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from PIL import Image
+
+
+def image_file(name='image.png', size=(800, 400), color='red', mode='RGB',
+               image_format=None, **options):
+    """
+    Загружаемая картинка одного цвета. Формат берётся по расширению
+    ``name``, если не задан ``image_format``; ``options`` передаются
+    в Image.save. Картинки с одинаковым содержимым хранятся одним файлом
+    (posts.storage), поэтому разным записям нужны разные цвета.
+    """
+    if image_format is None:
+        extension = os.path.splitext(name)[1].lower()
+        image_format = Image.registered_extensions()[extension]
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type=f'image/{image_format.lower()}')
+
+
+class TempMediaMixin:
+    """MEDIA_ROOT во временном каталоге, удаляемом после класса тестов."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls._media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls._media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+
+@contextmanager
+def run_on_commit():
+    """
+    Выполнить колбэки transaction.on_commit, добавленные в блоке, как
+    после коммита: TestCase не коммитит транзакцию теста, а
+    captureOnCommitCallbacks есть только с Django 3.2.
+    """
+    start = len(connection.run_on_commit)
+    yield
+    callbacks = connection.run_on_commit[start:]
+    del connection.run_on_commit[start:]
+    for callback in callbacks:
+        callback[1]()
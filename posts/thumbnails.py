@@ -0,0 +1,100 @@
+"""
+Метаданные миниатюр sorl-thumbnail для целой страницы за раз.
+
+{% thumbnail %} спрашивает хранилище ключей sorl о каждой картинке
+отдельно: десять обращений к кэшу, а после его сброса — десять запросов
+к базе на страницу. attach_thumbnails() вычисляет ключи миниатюр всех
+записей страницы так же, как sorl, и получает их одним get_many и
+одним запросом к базе, а перед ними держит LRU в памяти процесса.
+Миниатюры, которых ещё нет, по-прежнему создаёт {% thumbnail %}.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+# Та же миниатюра, что в карточке записи: {% thumbnail post.image "1100"
+# upscale=True %}
+GEOMETRY = '1100'
+OPTIONS = {'upscale': True}
+
+_lru = OrderedDict()
+_lock = threading.Lock()
+
+
+def thumbnail_key(file_, geometry=GEOMETRY, **options):
+    """Ключ миниатюры в хранилище sorl, как в ThumbnailBackend."""
+    backend = default.backend
+    source = ImageFile(file_)
+    options = {**OPTIONS, **options}
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return add_prefix(ImageFile(name, default.storage).key)
+
+
+def _load(keys):
+    """Сырые значения хранилища sorl по ключам: кэш, затем база."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        stored = dict(KVStoreModel.objects.filter(
+            key__in=missing).values_list('key', 'value'))
+        # как и sorl, запоминаем в кэше и отсутствие миниатюры
+        found = {key: stored.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(found)
+    return {key: value for key, value in values.items()
+            if value != EMPTY_VALUE}
+
+
+def get_thumbnails(files):
+    """Словарь имя картинки -> готовая миниатюра (ImageFile)."""
+    keys = {thumbnail_key(file_): file_.name for file_ in files}
+    thumbnails = {}
+    with _lock:
+        for key, name in keys.items():
+            if key in _lru:
+                _lru.move_to_end(key)
+                thumbnails[name] = _lru[key]
+    missing = [key for key, name in keys.items() if name not in thumbnails]
+    if missing:
+        loaded = {key: deserialize_image_file(value)
+                  for key, value in _load(missing).items()}
+        with _lock:
+            for key, thumbnail in loaded.items():
+                _lru[key] = thumbnail
+                thumbnails[keys[key]] = thumbnail
+            while len(_lru) > settings.POSTS_THUMBNAIL_LRU_SIZE:
+                _lru.popitem(last=False)
+    return thumbnails
+
+
+def attach_thumbnails(posts):
+    """
+    Положить в ``post.thumbnail`` готовую миниатюру картинки или None.
+    Записям с вариантами картинки (posts.images) миниатюра не нужна.
+    """
+    files = [post.image for post in posts
+             if post.image and not post.variant_widths]
+    thumbnails = get_thumbnails(files) if files else {}
+    for post in posts:
+        post.thumbnail = thumbnails.get(post.image.name)
+    return posts
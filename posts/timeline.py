@@ -0,0 +1,271 @@
+"""
+Ленты подписок.
+
+По умолчанию (POSTS_FOLLOW_FEED = 'fanout') новая запись сразу
+раскладывается в TimelineEntry всех подписчиков автора, и ``follow_index``
+читает готовую ленту по индексу (user, pub_date, post) без соединения
+Follow × Post. Авторы, у которых подписчиков больше POSTS_FANOUT_LIMIT,
+становятся популярными и не раскладываются: их записи читаются по
+индексу (author, pub_date, id) и подмешиваются слиянием. Популярность
+снимается, только когда подписчиков не больше POSTS_FANOUT_RESUME_LIMIT;
+тогда каждый подписчик добирает последние записи автора в свою ленту
+сам, при следующем её чтении.
+
+В режиме 'pull' лента собирается из закэшированных списков последних
+записей каждого автора слиянием через кучу, и в БД остаётся один запрос
+за записями страницы.
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginator import CursorPaginator
+from .singleflight import get_or_compute
+
+
+def is_popular(author_id):
+    return UserStats.objects.filter(user_id=author_id, popular=True).exists()
+
+
+def mark_popular(author_id):
+    """Автор с новым подписчиком мог стать популярным."""
+    UserStats.objects.filter(
+        user_id=author_id, popular=False,
+        followers_count__gt=settings.POSTS_FANOUT_LIMIT).update(popular=True)
+
+
+def mark_unpopular(author_id):
+    """
+    Автор, от которого отписались, мог перестать быть популярным. Его
+    записи тогда больше не подмешиваются при чтении, и подписчики
+    добирают их в ленту сами (popular_authors), а не в этом запросе.
+    """
+    if UserStats.objects.filter(
+            user_id=author_id, popular=True,
+            followers_count__lte=settings.POSTS_FANOUT_RESUME_LIMIT,
+    ).update(popular=False):
+        Follow.objects.filter(author_id=author_id).update(backfilled=False)
+
+
+def fan_out(post):
+    """Разложить новую запись по лентам подписчиков автора."""
+    if is_popular(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers.iterator()],
+        ignore_conflicts=True,
+    )
+
+
+def _recent_posts(author_id):
+    return list(Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date')[:settings.POSTS_TIMELINE_BACKFILL])
+
+
+def _backfill(user_id, author_id):
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in _recent_posts(author_id)],
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавить в ленту подписчика последние записи нового автора."""
+    if not is_popular(author_id):
+        _backfill(user_id, author_id)
+
+
+def prune(user_id, author_id):
+    """Убрать из ленты записи автора, от которого пользователь отписался."""
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 post__author_id=author_id).delete()
+
+
+def popular_authors(user_id):
+    """
+    Популярные авторы подписок. Заодно в ленту добираются записи тех,
+    кто перестал быть популярным после прошлого чтения: это один запрос
+    с подписками, которые надо дополнить, и обычно их нет.
+    """
+    follows = Follow.objects.filter(user_id=user_id).filter(
+        Q(author__stats__popular=True) | Q(backfilled=False)).values_list(
+        'author_id', 'author__stats__popular')
+    popular = []
+    for author_id, still_popular in follows:
+        if still_popular:
+            popular.append(author_id)
+        else:
+            _backfill(user_id, author_id)
+            Follow.objects.filter(user_id=user_id,
+                                  author_id=author_id).update(backfilled=True)
+    return popular
+
+
+def _after(queryset, key, position, older):
+    value, pk = position
+    op = 'lt' if older else 'gt'
+    return queryset.filter(Q(**{f'pub_date__{op}': value})
+                           | Q(pub_date=value, **{f'{key}__{op}': pk}))
+
+
+class FollowTimeline:
+    """
+    Лента подписок режима 'fanout' как последовательность для Paginator.
+
+    Позиции (pub_date, id) читаются из TimelineEntry пользователя и из
+    записей каждого популярного автора — всё по индексам и не дальше
+    конца страницы, — сливаются через heapq.merge, и записи страницы
+    достаются одним запросом.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.popular = popular_authors(user_id)
+
+    def __len__(self):
+        return self.count()
+
+    def count(self):
+        entries = TimelineEntry.objects.filter(user_id=self.user_id)
+        if not self.popular:
+            return entries.count()
+        # записи, разложенные до того, как автор стал популярным,
+        # не считаются дважды
+        popular = UserStats.objects.filter(
+            user_id__in=self.popular).aggregate(
+            total=Sum('posts_count'))['total'] or 0
+        return entries.exclude(
+            post__author_id__in=self.popular).count() + popular
+
+    def positions(self, position=None, older=True, limit=None):
+        """Позиции записей ленты от ``position``, новые первыми."""
+        sources = [(TimelineEntry.objects.filter(user_id=self.user_id),
+                    'post_id')]
+        sources += [(Post.objects.filter(author_id=author_id), 'id')
+                    for author_id in self.popular]
+        sign = '-' if older else ''
+        streams = []
+        for queryset, key in sources:
+            if position is not None:
+                queryset = _after(queryset, key, position, older)
+            streams.append(queryset.order_by(
+                f'{sign}pub_date', f'{sign}{key}').values_list(
+                'pub_date', key)[:limit])
+        merged = heapq.merge(*streams, reverse=older)
+        positions = []
+        for item in merged:
+            # запись популярного автора может быть и разложенной
+            if not positions or positions[-1] != item:
+                positions.append(item)
+                if len(positions) == limit:
+                    break
+        return positions
+
+    def posts(self, positions):
+        ids = [post_id for _, post_id in positions]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        return self.posts(self.positions(limit=index.stop)[index.start:])
+
+
+class TimelineCursorPaginator(CursorPaginator):
+    """CursorPaginator над FollowTimeline."""
+
+    def rows(self, position=None, older=True, limit=None):
+        return self.object_list.posts(
+            self.object_list.positions(position, older, limit))
+
+
+def follow_feed(user):
+    return FollowTimeline(user.pk)
+
+
+def author_posts_key(author_id):
+    return f'author_posts:{author_id}'
+
+
+def following_key(user_id):
+    return f'following:{user_id}'
+
+
+def _load_author_posts(author_id):
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pub_date', 'id')[:settings.POSTS_AUTHOR_TIMELINE_SIZE]
+    return [(pub_date.timestamp(), post_id) for pub_date, post_id in posts]
+
+
+def author_timelines(author_ids):
+    """Списки (timestamp, id) последних записей авторов, новые первыми."""
+    keys = {author_posts_key(author_id): author_id
+            for author_id in author_ids}
+    timelines = cache.get_many(keys)
+    missing = {key: _load_author_posts(author_id)
+               for key, author_id in keys.items() if key not in timelines}
+    if missing:
+        cache.set_many(missing, settings.POSTS_TIMELINE_CACHE_TIMEOUT)
+        timelines.update(missing)
+    return list(timelines.values())
+
+
+def followed_authors(user_id):
+    return get_or_compute(
+        following_key(user_id),
+        lambda: list(Follow.objects.filter(
+            user_id=user_id).values_list('author_id', flat=True)),
+        settings.POSTS_TIMELINE_CACHE_TIMEOUT)
+
+
+def forget_post(post):
+    """
+    Сбросить закэшированный список автора. Новая запись тоже только
+    сбрасывает его: дописать список на месте (get, insert, set) нельзя —
+    две одновременные записи автора затёрли бы друг друга.
+    """
+    cache.delete(author_posts_key(post.author_id))
+
+
+def forget_following(user_id):
+    cache.delete(following_key(user_id))
+
+
+class MergedTimeline:
+    """
+    Лента подписок как последовательность для Paginator.
+
+    Длина — сумма длин списков авторов, а срез сливает списки через
+    heapq.merge ровно до конца страницы и одним запросом достаёт записи.
+    """
+
+    def __init__(self, timelines):
+        self.timelines = timelines
+
+    def __len__(self):
+        return sum(len(timeline) for timeline in self.timelines)
+
+    def count(self):
+        return len(self)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        merged = heapq.merge(*self.timelines, reverse=True)
+        ids = [post_id for _, post_id in
+               islice(merged, index.start, index.stop)]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+
+def pull_feed(user):
+    return MergedTimeline(author_timelines(followed_authors(user.pk)))
@@ -0,0 +1,72 @@
+"""
+Обработка загружаемых картинок с ограниченным расходом памяти.
+
+Загрузки целиком пишутся во временный файл (FILE_UPLOAD_HANDLERS), а не
+в память. Размеры картинки проверяются по заголовку до декодирования,
+так что «бомба» в пару килобайт с гигантскими размерами отвергается
+сразу. Слишком большой оригинал уменьшается до POSTS_UPLOAD_MAX_SIDE —
+для JPEG через draft(), то есть уже при декодировании, — и
+пересохраняется без EXIF и прочих метаданных.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.forms import ValidationError
+from PIL import Image, ImageOps
+
+# Форматы, которые пересохраняются; прочие (например, GIF) сохраняются
+# как есть после проверки размеров
+FORMATS = {
+    'JPEG': ('image/jpeg', 'jpg'),
+    'PNG': ('image/png', 'png'),
+    'WEBP': ('image/webp', 'webp'),
+}
+# Снимки телефонов с Multi-Picture данными Pillow открывает как MPO
+# с несколькими кадрами: это JPEG, и пересохраняется его первый кадр
+ALIASES = {'MPO': 'JPEG'}
+# Анимация сохраняется как есть только у этих форматов
+ANIMATED = ('GIF', 'WEBP')
+
+
+def check_dimensions(image):
+    if image.width * image.height > settings.POSTS_UPLOAD_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение слишком большое: %(width)s×%(height)s точек.',
+            code='image_too_large',
+            params={'width': image.width, 'height': image.height})
+
+
+def process_image(upload):
+    """
+    Проверить и пересохранить загруженную картинку.
+    Возвращает новый файл на диске или исходный, если пересохранять нечего.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        check_dimensions(image)
+        image_format = ALIASES.get(image.format, image.format)
+        animated = getattr(image, 'is_animated', False)
+        if image_format not in FORMATS or (animated
+                                           and image_format in ANIMATED):
+            upload.seek(0)
+            return upload
+        max_side = settings.POSTS_UPLOAD_MAX_SIDE
+        image.draft(image.mode, (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        content_type, extension = FORMATS[image_format]
+        stem = os.path.splitext(os.path.basename(upload.name))[0]
+        # безымянный временный файл: хранилище копирует его частями и
+        # он сам удаляется при закрытии
+        result = UploadedFile(tempfile.TemporaryFile(), f'{stem}.{extension}',
+                              content_type)
+        # без exif= и icc_profile= метаданные в новый файл не попадают
+        image.save(result, image_format,
+                   quality=settings.POSTS_IMAGE_QUALITY, optimize=True)
+    result.size = result.tell()
+    result.seek(0)
+    return result
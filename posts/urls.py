@@ -8,6 +8,12 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('new/', views.new_post, name='new_post'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('media/resized/<int:width>/<path:path>', views.resized_image,
+         name='resized_image'),
+    path('tags/<str:tag>/', views.tag_posts, name='tag_posts'),
+    path('mentions/<str:username>/', views.mention_posts,
+         name='mention_posts'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path(
@@ -18,6 +24,9 @@ urlpatterns = [
     path('<str:username>/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
+    path('<str:username>/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
     path('<str:username>/follow/',
          views.profile_follow,
          name='profile_follow'),
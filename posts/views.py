@@ -1,35 +1,62 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import redirect, render, get_object_or_404
+from django.views.decorators.http import condition
+from PIL import Image
 
+from yatube.files import open_file_response
+
+from . import resize
+from .anchors import GLOBAL_FEED, author_feed, group_feed
+from .cache import (follow_feeds, fragment_context, group_etag, index_etag,
+                    post_etag, profile_etag, surrogate_keys, tag_response)
+from .comments import attach_to_page, comment_queryset, get_comment_page
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
+from .models import Post, Group, User, Follow, Hashtag
+from .paginator import get_page
+from .search import SearchPaginator
+from .stats import get_stats
+from .tags import entries_page, normalize_tag
+from .timeline import TimelineCursorPaginator, follow_feed, pull_feed
 
 
+@condition(etag_func=index_etag)
 def index(request):
-    post_list = Post.objects.select_related('group')
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'index.html', {'page': page,
-                                          'paginator': paginator})
-
-
+    post_list = Post.objects.select_related('author', 'group')
+    page, paginator = get_page(request, post_list, feed=GLOBAL_FEED)
+    attach_to_page(page)
+    response = render(request, 'index.html', {
+        'page': page,
+        'paginator': paginator,
+        **fragment_context(request, [GLOBAL_FEED]),
+    })
+    return tag_response(response, [GLOBAL_FEED, *surrogate_keys(page)])
+
+
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
+    post_list = group.posts.select_related('author', 'group')
+    page, paginator = get_page(request, post_list,
+                               feed=group_feed(group.id))
+    attach_to_page(page)
+    response = render(
         request,
         "group.html",
         {"group": group, "post_list": post_list,
-         "page": page, "paginator": paginator}
+         "page": page, "paginator": paginator,
+         **fragment_context(request, [group_feed(group.id)])}
     )
+    return tag_response(response,
+                        [group_feed(group.id), *surrogate_keys(page)])
 
 
 @login_required
+@transaction.atomic
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if request.method == 'POST':
@@ -44,6 +71,7 @@ def new_post(request):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
     form = CommentForm(request.POST or None)
@@ -56,44 +84,115 @@ def add_comment(request, username, post_id):
     return redirect('post', post.author, post_id)
 
 
+@condition(etag_func=profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    all_posts = author.posts.all()
-    paginator = Paginator(all_posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    all_posts = author.posts.select_related('author', 'group')
+    page, paginator = get_page(request, all_posts,
+                               feed=author_feed(author.id))
+    attach_to_page(page)
     following = False
     if request.user.is_authenticated:
         following = \
             User.objects.filter(following__user=request.user).exists()
-    return render(request, 'profile.html',
-                  {'page': page, 'author': author, 'paginator': paginator,
-                   'following': following})
+    response = render(
+        request, 'profile.html',
+        {'page': page, 'author': author, 'paginator': paginator,
+         'following': following, 'stats': get_stats(author),
+         **fragment_context(request, [author_feed(author.id)])})
+    return tag_response(response,
+                        [author_feed(author.id), *surrogate_keys(page)])
 
 
+@condition(etag_func=post_etag)
 def post_view(request, post_id, username):
-    author = get_object_or_404(User, username=username)
-    all_posts = author.posts.all().count()
-    post = get_object_or_404(Post, author__username=username, id=post_id)
-    comments = post.comments.all()
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    stats = get_stats(author)
+    post = get_object_or_404(Post.objects.select_related('author', 'group'),
+                             author__username=username, id=post_id)
+    # запрос не выполняется сам: он источник comment_page, а в контексте
+    # остаётся под прежним именем comments
+    comments = comment_queryset(post)
     form = CommentForm()
-    interests = author.follower.all().count()
-    followers = author.following.all().count()
     context = {'author': author,
-               'post_list': all_posts,
+               'stats': stats,
+               'post_list': stats.posts_count,
                'post': post,
                'comments': comments,
+               'comment_page': get_comment_page(request, comments),
                'form': form,
-               'interests': interests,
-               'followers': followers,
+               'interests': stats.following_count,
+               'followers': stats.followers_count,
                'show_comment': True, }
-    return render(request, 'post.html', context)
+    response = render(request, 'post.html', context)
+    return tag_response(response,
+                        [author_feed(author.id), *surrogate_keys([post])])
+
+
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев записи без обёртки страницы."""
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             author__username=username, id=post_id)
+    return render(request, 'includes/comment_list.html',
+                  {'post': post,
+                   'comment_page': get_comment_page(
+                       request, comment_queryset(post))})
+
+
+def search(request):
+    """Записи по полнотекстовому запросу ``q``, самые подходящие первыми."""
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(query, settings.POSTS_PER_PAGE)
+    page = paginator.get_page(after=request.GET.get('after'),
+                              before=request.GET.get('before'))
+    return render(request, 'search.html',
+                  {'query': query, 'page': page, 'paginator': paginator})
+
+
+def tag_posts(request, tag):
+    tag = get_object_or_404(Hashtag, name=normalize_tag(tag))
+    page, paginator = entries_page(request, tag.entries.all())
+    return render(request, 'tag.html',
+                  {'tag': tag, 'page': page, 'paginator': paginator})
+
+
+def mention_posts(request, username):
+    user = get_object_or_404(User, username=username)
+    page, paginator = entries_page(request, user.mentions.all())
+    return render(request, 'tag.html',
+                  {'mentioned': user, 'page': page, 'paginator': paginator})
+
+
+def resized_image(request, width, path):
+    """Картинка записи шириной ``width`` из дискового кэша копий."""
+    if width not in settings.POSTS_RESIZE_WIDTHS:
+        raise Http404
+    try:
+        cached = resize.cached_path(width, path)
+        # отдаём открытый здесь файл: вытеснение копии соседним запросом
+        # после проверки не превратится в 404
+        try:
+            file = open(cached, 'rb')
+        except FileNotFoundError:
+            if not Post.objects.filter(image=path).exists():
+                raise Http404
+            file = resize.resize(path, width)
+        else:
+            resize.touch(cached)
+    except (OSError, Image.DecompressionBombError, SuspiciousFileOperation):
+        raise Http404
+    # имена загрузок не повторяются, поэтому копия по адресу не меняется
+    return open_file_response(request, file, cached, immutable=True,
+                              max_age=settings.POSTS_RESIZE_MAX_AGE)
 
 
 @login_required
 def post_edit(request, username: str, post_id: int):
     """This view edits the post by its id and saves changes in database."""
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             id=post_id, author__username=username)
     if post.author != request.user:
         return redirect('post', username, post_id)
     form = PostForm(request.POST or None,
@@ -119,15 +218,23 @@ def server_error(request):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    if settings.POSTS_FOLLOW_FEED == 'pull':
+        paginator = Paginator(pull_feed(request.user),
+                              settings.POSTS_PER_PAGE)
+        page = paginator.get_page(request.GET.get('page'))
+    else:
+        page, paginator = get_page(
+            request, follow_feed(request.user),
+            cursor_paginator=TimelineCursorPaginator)
+    attach_to_page(page)
     return render(request, 'includes/follow.html',
-                  {'paginator': paginator, 'page': page, 'follow': True})
+                  {'paginator': paginator, 'page': page, 'follow': True,
+                   **fragment_context(
+                       request, follow_feeds(request.user.pk), private=True)})
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -136,6 +243,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
@@ -0,0 +1,504 @@
+"""
+Общий для всех воркеров кэш в файле SQLite.
+
+LocMemCache у каждого процесса gunicorn свой: фрагменты и поколения лент
+копируются в каждом воркере и не видят сбросов соседей. Этот бэкенд
+хранит записи в одном файле базы SQLite в режиме WAL: читатели не
+блокируют писателя, incr атомарен, а при переполнении вытесняются давно
+не читанные записи (LRU). Внешние сервисы не нужны.
+
+    CACHES = {'default': {
+        'BACKEND': 'yatube.cache.SQLiteCache',
+        'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }}
+"""
+import fcntl
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+'''
+
+# Чтение обновляет время доступа не чаще раза в секунду, чтобы горячие
+# ключи не превращали каждый get в запись
+TOUCH_EVERY = 1.0
+# Переполнение проверяется не чаще раза в столько вставок потока (но
+# хотя бы на каждую сотую часть MAX_ENTRIES): COUNT(*) обходит всю таблицу
+CULL_EVERY = 100
+# Ключей в одном запросе IN (...): предел переменных старых SQLite — 999
+MAX_VARIABLES = 500
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self._local = threading.local()
+
+    def _connection(self):
+        # соединение своё у каждого потока и у каждого процесса после fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.location, timeout=30,
+                                         isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _write(self, callback):
+        """Выполнить ``callback(connection)`` в одной транзакции записи."""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = callback(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    @staticmethod
+    def _dumps(value):
+        # целые числа хранятся как есть, чтобы incr работал внутри SQLite
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _chunks(keys):
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            yield chunk, ', '.join('?' * len(chunk))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?',
+            (key,)).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, now))
+            return default
+        if accessed < now - TOUCH_EVERY:
+            connection.execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return self._loads(value)
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        now = time.time()
+        connection = self._connection()
+        found = {}
+        touched = []
+        for chunk, marks in self._chunks(list(made)):
+            rows = connection.execute(
+                'SELECT key, value, expires, accessed FROM cache'
+                f' WHERE key IN ({marks})', chunk)
+            for key, value, expires, accessed in rows:
+                # просроченные строки удалит _cull
+                if expires is not None and expires <= now:
+                    continue
+                if accessed < now - TOUCH_EVERY:
+                    touched.append(key)
+                found[made[key]] = self._loads(value)
+        for chunk, marks in self._chunks(touched):
+            connection.execute(
+                f'UPDATE cache SET accessed = ? WHERE key IN ({marks})',
+                [now, *chunk])
+        return found
+
+    def _store(self, mode, key, value, timeout, version):
+        key = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        value = self._dumps(value)
+
+        def store(connection):
+            now = time.time()
+            if mode == 'IGNORE':
+                connection.execute(
+                    'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                    (key, now))
+            cursor = connection.execute(
+                f'INSERT OR {mode} INTO cache (key, value, expires, accessed)'
+                ' VALUES (?, ?, ?, ?)', (key, value, expires, now))
+            if cursor.rowcount:
+                self._cull(connection, now)
+            return bool(cursor.rowcount)
+
+        return self._write(store)
+
+    def _cull(self, connection, now, inserted=1):
+        every = max(min(CULL_EVERY, self._max_entries // 100), 1)
+        inserts = getattr(self._local, 'inserts', 0) + inserted
+        self._local.inserts = inserts
+        if inserts < every:
+            return
+        self._local.inserts = 0
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        count, = connection.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (max(count // self._cull_frequency, 1),))
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store('REPLACE', key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store('IGNORE', key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [(self._key(key, version), self._dumps(value))
+                for key, value in data.items()]
+
+        def store(connection):
+            now = time.time()
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed)'
+                ' VALUES (?, ?, ?, ?)',
+                [(key, value, expires, now) for key, value in rows])
+            if rows:
+                self._cull(connection, now, len(rows))
+
+        self._write(store)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()))
+        return bool(cursor.rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+
+        def incr(connection):
+            now = time.time()
+            cursor = connection.execute(
+                "UPDATE cache SET value = value + ?, accessed = ?"
+                " WHERE key = ? AND typeof(value) = 'integer'"
+                " AND (expires IS NULL OR expires > ?)",
+                (delta, now, key, now))
+            if not cursor.rowcount:
+                raise ValueError(f"Key '{key}' not found")
+            return connection.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)).fetchone()[0]
+
+        return self._write(incr)
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            'DELETE FROM cache WHERE key = ?', (key,))
+        return bool(cursor.rowcount)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        connection = self._connection()
+        for chunk, marks in self._chunks(keys):
+            connection.execute(
+                f'DELETE FROM cache WHERE key IN ({marks})', chunk)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (key, time.time())).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # соединения живут всё время процесса, как у LocMemCache
+        pass
+
+
+class TieredCache(BaseCache):
+    """
+    Двухуровневый кэш: LRU в памяти воркера (L1) перед общим кэшем (L2).
+
+    Горячие ключи (поколения лент, статистика авторов) читаются из L1 без
+    обращения к L2. Каждая запись, incr и удаление дописывают ключ в общий
+    журнал изменений; перед чтением воркер дочитывает журнал и выбрасывает
+    из L1 изменённые соседями ключи. Записи L1 живут не дольше
+    ``L1_TIMEOUT`` секунд на случай потерянной строки журнала.
+
+    OPTIONS: ``L2`` — алиас общего кэша в CACHES, ``CHANGELOG`` — путь
+    к журналу, ``L1_MAX_ENTRIES``, ``L1_TIMEOUT``, ``CHANGELOG_MAX_BYTES``.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', 'shared')
+        self.changelog = ChangeLog(options['CHANGELOG'],
+                                   options.get('CHANGELOG_MAX_BYTES',
+                                               1024 * 1024))
+        self.l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self.l1_timeout = options.get('L1_TIMEOUT', 60)
+        self._l1 = OrderedDict()
+        self._lock = threading.RLock()
+        # сколько раз выбрасывались ключи L1: по нему видно, не было ли
+        # изменений, пока значение читалось из L2
+        self._invalidations = 0
+        self.hits = {'l1': 0, 'l2': 0}
+        self.misses = {'l1': 0, 'l2': 0}
+
+    @property
+    def l2(self):
+        from django.core.cache import caches
+        return caches[self.l2_alias]
+
+    def stats(self):
+        """Попадания и промахи по уровням с момента запуска воркера."""
+        return {tier: {'hits': self.hits[tier], 'misses': self.misses[tier]}
+                for tier in ('l1', 'l2')}
+
+    def _sync(self):
+        changed = self.changelog.read()
+        if changed is None:
+            self._l1.clear()
+            self._invalidations += 1
+        elif changed:
+            for key in changed:
+                self._l1.pop(key, None)
+            self._invalidations += 1
+
+    def _fill(self, seen, key, value):
+        # пока читался L2, ключ мог измениться здесь или у соседа, и
+        # прочитанное значение могло устареть: тогда в L1 его не кладём
+        self._sync()
+        if self._invalidations == seen:
+            self._l1_set(key, value)
+
+    def _l1_get(self, key):
+        entry = self._l1.get(key)
+        if entry is None or entry[1] <= time.time():
+            self._l1.pop(key, None)
+            return MISSING
+        self._l1.move_to_end(key)
+        if isinstance(entry[0], Pickled):
+            return pickle.loads(entry[0])
+        return entry[0]
+
+    def _l1_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        expires = time.time() + self.l1_timeout
+        backend_expires = self.get_backend_timeout(timeout)
+        if backend_expires is not None:
+            expires = min(expires, backend_expires)
+        # изменяемые значения хранятся копией, как в LocMemCache
+        if not isinstance(value, IMMUTABLE):
+            value = Pickled(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        self._l1[key] = (value, expires)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_max_entries:
+            self._l1.popitem(last=False)
+
+    def _changed(self, *keys):
+        for key in keys:
+            self._l1.pop(key, None)
+        self._invalidations += 1
+        self.changelog.append(keys)
+
+    def get(self, key, default=None, version=None):
+        made = self.make_key(key, version)
+        with self._lock:
+            self._sync()
+            value = self._l1_get(made)
+            if value is not MISSING:
+                self.hits['l1'] += 1
+                return value
+            self.misses['l1'] += 1
+            seen = self._invalidations
+        value = self.l2.get(key, MISSING, version=version)
+        with self._lock:
+            if value is MISSING:
+                self.misses['l2'] += 1
+                return default
+            self.hits['l2'] += 1
+            self._fill(seen, made, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        with self._lock:
+            self._sync()
+            for key in keys:
+                value = self._l1_get(self.make_key(key, version))
+                if value is not MISSING:
+                    found[key] = value
+            self.hits['l1'] += len(found)
+            self.misses['l1'] += len(keys) - len(found)
+            seen = self._invalidations
+        missing = [key for key in keys if key not in found]
+        if missing:
+            loaded = self.l2.get_many(missing, version=version)
+            with self._lock:
+                self.hits['l2'] += len(loaded)
+                self.misses['l2'] += len(missing) - len(loaded)
+                for key, value in loaded.items():
+                    self._fill(seen, self.make_key(key, version), value)
+            found.update(loaded)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        made = self.make_key(key, version)
+        with self._lock:
+            self._changed(made)
+            self._l1_set(made, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            with self._lock:
+                self._changed(self.make_key(key, version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._lock:
+            self._changed(self.make_key(key, version))
+        return self.l2.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        with self._lock:
+            self._changed(self.make_key(key, version))
+        return value
+
+    def delete(self, key, version=None):
+        deleted = self.l2.delete(key, version=version)
+        with self._lock:
+            self._changed(self.make_key(key, version))
+        return deleted
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version=version) is not MISSING
+
+    def clear(self):
+        self.l2.clear()
+        with self._lock:
+            self._l1.clear()
+            self._invalidations += 1
+            self.changelog.append([CLEAR])
+
+
+MISSING = object()
+CLEAR = '*'
+IMMUTABLE = (int, float, str, type(None))
+
+
+class Pickled(bytes):
+    """Сериализованное значение в L1."""
+
+
+class ChangeLog:
+    """
+    Журнал изменённых ключей: файл, в который все воркеры дописывают
+    строки под flock. Каждый читатель помнит своё смещение. Переполненный
+    журнал заменяется пустым файлом, и читатели, заметив новый inode,
+    полностью сбрасывают свой L1.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._file = None
+        self._inode = None
+        self._offset = 0
+        self._pid = None
+
+    def _open(self):
+        if self._pid != os.getpid():
+            # после fork наследованное смещение не годится
+            self._file = None
+            self._pid = os.getpid()
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            inode = None
+        if self._file is None or inode != self._inode:
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.path, 'ab+')
+            self._inode = os.fstat(self._file.fileno()).st_ino
+            self._offset = self._file.seek(0, os.SEEK_END)
+            return False
+        return True
+
+    def read(self):
+        """Ключи, изменённые с прошлого чтения, или None, если журнал новый."""
+        if not self._open():
+            return None
+        size = os.fstat(self._file.fileno()).st_size
+        if size == self._offset:
+            return []
+        self._file.seek(self._offset)
+        data = self._file.read(size - self._offset)
+        complete = data.rfind(b'\n') + 1
+        self._offset += complete
+        keys = data[:complete].decode().split()
+        if CLEAR in keys:
+            return None
+        return keys
+
+    def append(self, keys):
+        line = ('\n'.join(keys) + '\n').encode()
+        with open(self.path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._open()
+            start = self._file.seek(0, os.SEEK_END)
+            self._file.write(line)
+            self._file.flush()
+            if self._offset == start:
+                # свои изменения читателю этого воркера уже известны
+                self._offset = self._file.tell()
+            if self._file.tell() > self.max_bytes:
+                fresh = f'{self.path}.{os.getpid()}'
+                open(fresh, 'wb').close()
+                os.replace(fresh, self.path)
@@ -0,0 +1,186 @@
+"""
+Отдача файлов MEDIA_ROOT и STATIC_ROOT без django.views.static.
+
+В отличие от static(), работает и при DEBUG = False:
+
+* ETag и Last-Modified по stat() файла, ответы 304 и 412 на
+  If-None-Match / If-Modified-Since / If-Match;
+* Range: bytes=… с одним диапазоном (206, 416), с учётом If-Range;
+* файл целиком отдаётся через FileResponse, то есть wsgi.file_wrapper
+  сервера, а не читается в Python;
+* при FILES_SENDFILE сам файл отдаёт веб-сервер: 'x-sendfile' (Apache,
+  lighttpd) получает абсолютный путь, 'x-accel-redirect' (nginx) —
+  путь запроса с префиксом FILES_ACCEL_PREFIX, который должен вести
+  в internal-локацию с тем же каталогом;
+* имена с хэшем содержимого (posts.storage, ManifestStaticFilesStorage)
+  не меняют содержимого и кэшируются на год с immutable.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Хэш в имени: 12 знаков у ManifestStaticFilesStorage (style.1a2b….css),
+# 64 у posts.storage — в том числе в путях вариантов и копий
+HASHED_RE = re.compile(r'(?:^|[/.])[0-9a-f]{12}(?:[0-9a-f]{52})?[/.]')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def is_hashed(path):
+    return bool(HASHED_RE.search(path))
+
+
+def parse_range(header, size):
+    """
+    Диапазон из заголовка Range как (первый, последний) байт.
+    None — отдать файл целиком: заголовка нет, он непонятен или в нём
+    несколько диапазонов. ValueError — диапазон за пределами файла.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        if int(last) == 0:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def _read(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _range(request, etag, last_modified, size):
+    header = request.META.get('HTTP_RANGE')
+    if not header or request.method not in ('GET', 'HEAD'):
+        return None
+    # If-Range: диапазон только если файл не изменился
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range not in (etag, last_modified):
+        return None
+    return parse_range(header, size)
+
+
+def _content(request, file, full_path, byte_range, size):
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    sendfile = settings.FILES_SENDFILE
+    if sendfile:
+        # диапазоны и тело отдаст веб-сервер
+        file.close()
+        response = HttpResponse(content_type=content_type)
+        if sendfile == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = quote(
+                settings.FILES_ACCEL_PREFIX.rstrip('/') + request.path)
+        else:
+            response['X-Sendfile'] = full_path
+    elif byte_range is None:
+        # FileResponse взял бы длину по имени файла, а по этому пути
+        # файла уже может не быть: отдаём его без имени, длину ставим сами
+        response = FileResponse(open(os.dup(file.fileno()), 'rb'),
+                                content_type=content_type)
+        file.close()
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read(file, start, end - start + 1),
+            status=206, content_type=content_type)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def file_response(request, full_path, immutable=False, max_age=None):
+    """Ответ с файлом ``full_path``; Http404, если это не обычный файл."""
+    try:
+        file = open(full_path, 'rb')
+    except (OSError, ValueError):
+        raise Http404
+    return open_file_response(request, file, full_path, immutable, max_age)
+
+
+def open_file_response(request, file, full_path, immutable=False,
+                       max_age=None):
+    """
+    Ответ с уже открытым файлом ``file`` по пути ``full_path``; файл
+    закроет сам ответ.
+
+    Отдаётся именно открытый файл, даже если по пути его тем временем
+    удалили или заменили (кроме FILES_SENDFILE: там веб-сервер открывает
+    путь заново). По пути определяется тип содержимого.
+    """
+    stat_result = os.fstat(file.fileno())
+    if not stat.S_ISREG(stat_result.st_mode):
+        file.close()
+        raise Http404
+    size = stat_result.st_size
+    etag = f'"{stat_result.st_mtime_ns:x}-{size:x}"'
+    last_modified = http_date(stat_result.st_mtime)
+    if max_age is None:
+        max_age = (settings.FILES_IMMUTABLE_MAX_AGE if immutable
+                   else settings.FILES_MAX_AGE)
+
+    headers = HttpResponse()
+    headers['ETag'] = etag
+    headers['Last-Modified'] = last_modified
+    headers['Accept-Ranges'] = 'bytes'
+    headers['Cache-Control'] = f'public, max-age={max_age}' + (
+        ', immutable' if immutable else '')
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=int(stat_result.st_mtime),
+        response=headers)
+    if conditional is not headers:
+        file.close()
+        return conditional
+
+    try:
+        byte_range = _range(request, etag, last_modified, size)
+    except ValueError:
+        file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    else:
+        response = _content(request, file, full_path, byte_range, size)
+    for header in ('ETag', 'Last-Modified', 'Accept-Ranges',
+                   'Cache-Control'):
+        response[header] = headers[header]
+    return response
+
+
+def serve(request, path, root_setting):
+    """
+    Файл ``path`` из каталога настройки ``root_setting`` (MEDIA_ROOT,
+    STATIC_ROOT); каталог читается при каждом запросе.
+    """
+    try:
+        full_path = safe_join(getattr(settings, root_setting), path)
+    except SuspiciousFileOperation:
+        raise Http404
+    return file_response(request, full_path, immutable=is_hashed(path))
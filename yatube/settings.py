@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'posts.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -84,10 +85,23 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # SQLite с BEGIN IMMEDIATE и проверкой соединений (yatube.sqlite3)
+        'ENGINE': 'yatube.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 0 if DEBUG else 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+# Прагмы каждого нового соединения с SQLite: читатели не ждут писателя,
+# писатель ждёт блокировку до 5 с, fsync только на контрольных точках,
+# 256 МБ файла отображаются в память, кэш страниц — 64 МБ
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -123,17 +137,46 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# В продакшене кэш общий для всех воркеров на хосте (файл SQLite в WAL)
+# с LRU в памяти каждого воркера перед ним, при разработке и в тестах —
+# память процесса, чтобы не переживать запуски
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.cache.TieredCache',
+            'OPTIONS': {
+                'L2': 'shared',
+                'CHANGELOG': os.path.join(BASE_DIR, 'cache.changes'),
+                'L1_MAX_ENTRIES': 1000,
+            },
+        },
+        'shared': {
+            'BACKEND': 'yatube.cache.SQLiteCache',
+            'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
     }
-}
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Отдача файлов (yatube.files): None — сама Django, 'x-sendfile' —
+# Apache/lighttpd, 'x-accel-redirect' — nginx, internal-локация которого
+# начинается с FILES_ACCEL_PREFIX, например /internal/media/
+FILES_SENDFILE = None
+FILES_ACCEL_PREFIX = '/internal'
+FILES_MAX_AGE = 60 * 60
+# Для имён с хэшем содержимого
+FILES_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
 # Login
 
 LOGIN_URL = "/auth/login/"
@@ -141,5 +184,67 @@ LOGIN_REDIRECT_URL = "index"
 # LOGOUT_REDIRECT_URL = "index"
 
 
+# Posts
+
+POSTS_PER_PAGE = 10
+# Курсорные ссылки ?after=/?before= вместо номеров страниц во всех лентах
+POSTS_CURSOR_PAGINATION = False
+# Каждые K страниц ленты запоминается якорь для ?page=N без OFFSET
+POSTS_ANCHOR_EVERY = 10
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# подписок, их записи подмешиваются при чтении
+POSTS_FANOUT_LIMIT = 1000
+# Раскладка возобновляется, только когда подписчиков становится не больше
+# этого: иначе подписки и отписки у порога раз за разом перекладывали бы
+# ленты
+POSTS_FANOUT_RESUME_LIMIT = 900
+# Сколько последних записей автора попадает в ленту при подписке
+POSTS_TIMELINE_BACKFILL = 200
+# Движок ленты подписок: 'fanout' — материализованные ленты в БД,
+# 'pull' — слияние закэшированных списков последних записей авторов
+POSTS_FOLLOW_FEED = 'fanout'
+POSTS_AUTHOR_TIMELINE_SIZE = 200
+POSTS_TIMELINE_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько последних комментариев показывать под записью в лентах
+POSTS_COMMENTS_PREVIEW = 3
+POSTS_COMMENTS_PER_PAGE = 20
+# Фрагменты лент сбрасываются сигналами, таймаут лишь ограничивает память
+POSTS_FRAGMENT_TIMEOUT = 60 * 60 * 6
+# Пересчёт устаревшего фрагмента: блокировка, срок, в течение которого
+# после истечения ещё можно отдавать прежнее значение, и коэффициент
+# раннего обновления (0 — только по истечении)
+POSTS_CACHE_LOCK_TIMEOUT = 10
+POSTS_CACHE_STALE_TIMEOUT = 60
+POSTS_CACHE_EARLY_REFRESH = 1.0
+# Варианты картинок записей: ширины, форматы (последний — запасной для
+# <img>), качество и число процессов пула; 0 — готовить сразу в запросе
+POSTS_IMAGE_WIDTHS = (320, 640, 1100)
+POSTS_IMAGE_FORMATS = ('webp', 'jpeg')
+POSTS_IMAGE_QUALITY = 82
+POSTS_IMAGE_WORKERS = 0 if DEBUG else 2
+# Сторона заглушки картинки, которая видна до её загрузки
+POSTS_PLACEHOLDER_SIZE = 16
+# Сколько метаданных миниатюр sorl держать в памяти процесса
+POSTS_THUMBNAIL_LRU_SIZE = 1000
+# Копии картинок по запросу (/media/resized/<w>/...): разрешённые ширины,
+# объём дискового кэша и срок кэширования в браузере
+POSTS_RESIZE_WIDTHS = (160, 320, 640, 1100)
+POSTS_RESIZE_CACHE_BYTES = 256 * 1024 * 1024
+POSTS_RESIZE_MAX_AGE = 60 * 60 * 24 * 365
+# Загружаемые картинки: не больше стольких точек по заголовку, а
+# оригинал уменьшается до такой длинной стороны
+POSTS_UPLOAD_MAX_PIXELS = 50_000_000
+POSTS_UPLOAD_MAX_SIDE = 2560
+# Картинки без ссылок удаляются не раньше чем через столько секунд
+# после последнего обращения к файлу (collect_image_blobs)
+POSTS_BLOB_GC_GRACE = 60 * 60
+
+# Загрузки сразу пишутся во временный файл, а не держатся в памяти
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Кэш целых страниц для анонимных читателей; 0 отключает его
+POSTS_PAGE_CACHE_TIMEOUT = 0 if DEBUG else 60 * 60
+
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
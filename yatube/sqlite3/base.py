@@ -0,0 +1,74 @@
+"""
+SQLite для нескольких воркеров с постоянными соединениями.
+
+Стандартный бэкенд открывает транзакции обычным BEGIN: запрос вроде
+add_comment сначала читает запись, а при попытке писать получает
+«database is locked» сразу, не дожидаясь busy_timeout, если соседний
+воркер успел записать раньше. Здесь транзакции начинаются с
+BEGIN IMMEDIATE и ждут блокировку записи заранее.
+
+При создании соединения (connection_created) применяются прагмы из
+SQLITE_PRAGMAS: WAL, busy_timeout, synchronous=NORMAL, mmap_size и
+cache_size. Соединения живут CONN_MAX_AGE секунд; CONN_HEALTH_CHECKS,
+как в Django 4.1, проверяет их между запросами: SELECT 1 и тот же ли
+файл базы, — и закрывает негодные.
+
+    DATABASES = {'default': {
+        'ENGINE': 'yatube.sqlite3',
+        'NAME': '/srv/yatube/db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    }}
+"""
+import os
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.backends.sqlite3 import base
+from django.dispatch import receiver
+
+Database = base.Database
+
+
+def _inode(name):
+    try:
+        stat = os.stat(name)
+    except (OSError, ValueError, TypeError):
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        self.database_inode = _inode(self.settings_dict['NAME'])
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except Database.Error:
+            return False
+        # файл базы заменили (восстановили из копии) — соединение
+        # смотрит на старый
+        return self.database_inode == _inode(self.settings_dict['NAME'])
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        if (self.connection is not None
+                and self.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not self.in_atomic_block
+                and not self.is_usable()):
+            self.close()
@@ -1,8 +1,11 @@
+import re
+
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf.urls import handler404, handler500
 from django.conf import settings
-from django.conf.urls.static import static
+
+from yatube import files
 
 handler404 = "posts.views.page_not_found"  # noqa
 handler500 = "posts.views.server_error"  # noqa
@@ -15,8 +18,14 @@ urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL,
-                          document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL,
-                          document_root=settings.STATIC_ROOT)
+
+def serve_files(prefix, root_setting):
+    """Маршрут yatube.files.serve для префикса вроде /media/."""
+    return re_path(r'^%s(?P<path>.+)$' % re.escape(prefix.lstrip('/')),
+                   files.serve, {'root_setting': root_setting})
+
+
+urlpatterns += [
+    serve_files(settings.MEDIA_URL, 'MEDIA_ROOT'),
+    serve_files(settings.STATIC_URL, 'STATIC_ROOT'),
+]